@@ -1,24 +1,70 @@
 import os
+import io
 import sys
 import time
-from PIL import Image, ImageEnhance, ImageOps, ImageFilter
+import glob
+import shutil
+import hashlib
+from PIL import Image, ImageEnhance, ImageFilter
 import numpy as np
-import keyboard
+try:
+    import keyboard  # only the interactive loop needs it (root on Linux)
+except ImportError:
+    keyboard = None
 from termcolor import colored
 import pyperclip
-import cv2
-from skimage import feature
 from colorama import init, Back, Fore
-import matplotlib.pyplot as plt
-from concurrent.futures import ThreadPoolExecutor
 import argparse
 import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import Future, as_completed
+from functools import partial
+from ascii_engine import (render_chars, render_colored, grid_size, prescale, PIPELINE_MODES,
+                          SourceImage, MAX_IMAGE_PIXELS, COLOR_MATRICES,
+                          apply_color_matrix, apply_point_ops, EDGE_BACKENDS, find_edges,
+                          direction_glyphs, CellGrid, COLORMAP_STOPS, render_heatmap,
+                          DITHER_MODES, subpixel_grid, render_subpixels, colormap_table,
+                          heatmap_levels, render_text_image, subpixel_mode, glyph_tile,
+                          oversample, decode_width, active_chars, cell_gray,
+                          AnimatedSource, LRUCache, ART_MEMORY_BUDGET, TerminalRenderer,
+                          FrameScheduler, is_video, read_video_frame, VideoStream,
+                          FRAME_SEPARATOR, load_image, parse_frame_size, read_raw_frames,
+                          RECORDERS, TextRecorder, FramePool, video_fps, video_frames,
+                          worker_pool, call_worker, palette_lut, parse_shard, read_manifest,
+                          CheckpointLog, merge_checkpoints, FolderWatcher, WATCH_SETTLE, ArtCache,
+                          ART_CACHE_SIZE, file_digest, one_entry, ConversionService, ServiceBusy,
+                          SERVICE_QUEUE_SIZE)
 
 init()  # Colorama'yı başlat
 
+SAVE_FORMATS = {'1': 'txt', '2': 'html', '3': 'png', '4': 'json'}
+MAX_REQUEST_BYTES = 32 * 1024 * 1024
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff')
+# Modes whose cells keep their (toned) color and go through the palette renderer
+COLOR_MODES = ('colored', 'sepia', 'tone')
+# Per-item settings a batch manifest may override -> converter attributes
+MANIFEST_SETTINGS = {
+    'width': 'output_width',
+    'zoom': 'zoom_level',
+    'color_mode': 'current_color_mode',
+    'char_set': 'current_char_set',
+    'palette': 'palette',
+    'colormap': 'colormap',
+    'color_step': 'color_step',
+    'dither': 'dither',
+    'contrast': 'contrast',
+    'brightness': 'brightness',
+    'sharpness': 'sharpness',
+    'shape_match': 'shape_match',
+    'edge_glyphs': 'edge_glyphs',
+    'calibrate': 'calibrate',
+}
+
 class UltimateASCIIArtConverter:
     def __init__(self):
         self.image_path = ""
+        self.source = SourceImage()
         self.ascii_art = ""
         self.output_width = 100
         self.char_sets = {
@@ -26,6 +72,8 @@ class UltimateASCIIArtConverter:
             'extended': " `.-':_,^=;><+!rc*/z?sLTv)J7(|Fi{C}fI31tlu[neoZ5Yxjya]2ESwqkP6h9d4VpOGbUAKXHm8RD#$Bg0MNWQ%&@",
             'blocks': " ░▒▓█",
             'inverted': "@#S%?*+;:,. ",
+            'braille': "⠀⠁⠃⠇⡇⣇⣧⣷⣿",
+            'halfblock': " ▀▄█",
             'custom': ""
         }
         self.current_char_set = 'basic'
@@ -37,9 +85,22 @@ class UltimateASCIIArtConverter:
             'blur': "Blur effect",
             'invert': "Inverted",
             'sepia': "Sepia tone",
-            'heatmap': "Heatmap"
+            'heatmap': "Heatmap",
+            'tone': "Color tone preset"
         }
         self.current_color_mode = 'none'
+        self.tones = {
+            'warm': "Warm",
+            'cool': "Cool",
+            'duotone': "Duotone"
+        }
+        self.tone = 'warm'
+        self.colormaps = {
+            'inferno': "Inferno",
+            'jet': "Jet",
+            'turbo': "Turbo"
+        }
+        self.colormap = 'inferno'
         self.preview_mode = True
         self.zoom_level = 1.0
         self.contrast = 1.0
@@ -47,10 +108,37 @@ class UltimateASCIIArtConverter:
         self.sharpness = 1.0
         self.edge_intensity = 1.0
         self.blur_radius = 0
-        self.animation_frames = []
+        self.edge_backend = 'cv2'
+        self.edge_glyphs = False
+        self.grid = None
+        self.cells = None
+        self.cells_key = None
+        self.pipeline_mode = 'fast'
+        self.pipeline_scale = 1.0
+        self.animation = AnimatedSource()
+        self.frame_cache = LRUCache(ART_MEMORY_BUDGET)
         self.animation_speed = 0.1
+        self.target_fps = None
+        self.workers = os.cpu_count() or 1
+        self.video_preview = None
         self.is_animated = False
         self.palette = "default"
+        self.color_step = 1
+        self.dither = 'none'
+        self.shape_match = False
+        self.glyph_font = None
+        self.calibrate = True
+        self.palettes = {
+            'default': "Basic colors",
+            'vivid': "True RGB colors",
+            'grayscale': "Grayscale",
+            'retro': "Retro green terminal",
+            'ansi16': "16 ANSI colors",
+            'xterm256': "xterm 256 colors"
+        }
+        self.render_stats = None
+        self.art_cache = None
+        self.digests = LRUCache(256, one_entry)
         self.save_config = {
             'format': 'txt',
             'html_wrap': False,
@@ -62,6 +150,16 @@ class UltimateASCIIArtConverter:
         self.config_file = "ascii_config.json"
         self.load_config()
 
+    def __getstate__(self):
+        # Pool workers get the settings, not the loaded images and caches
+        state = self.__dict__.copy()
+        for name in ('animation', 'frame_cache', 'cells', 'history', 'video_preview'):
+            state[name] = None
+        state['source'] = SourceImage(self.source.max_pixels)
+        state['digests'] = LRUCache(self.digests.max_cost, one_entry)
+        state['ascii_art'] = ""
+        return state
+    
     # -------------------- Core Functions --------------------
     def clear_screen(self):
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -74,12 +172,23 @@ class UltimateASCIIArtConverter:
     def display_status(self):
         print(colored("\n⚙️ CURRENT SETTINGS:", 'yellow', attrs=['bold']))
         print(colored(f"📁 Image: {self.image_path if self.image_path else 'Not selected'}", 'yellow'))
-        print(colored(f"🖥️  Width: {self.output_width} | 🔍 Zoom: {self.zoom_level:.1f}x", 'yellow'))
-        print(colored(f"🎨 Color Mode: {self.color_modes[self.current_color_mode]}", 'yellow'))
-        print(colored(f"🔤 Char Set: {self.current_char_set} ({self.char_sets[self.current_char_set][:10]}...)", 'yellow'))
-        print(colored(f"🌈 Palette: {self.palette}", 'yellow'))
+        print(colored(f"🖥️  Width: {self.output_width} | 🔍 Zoom: {self.zoom_level:.1f}x | 🚀 Pipeline: {self.pipeline_mode}", 'yellow'))
+        mode_label = self.color_modes[self.current_color_mode]
+        if self.current_color_mode == 'tone':
+            mode_label += f" ({self.tones[self.tone]})"
+        elif self.current_color_mode == 'heatmap':
+            mode_label += f" ({self.colormaps[self.colormap]})"
+        print(colored(f"🎨 Color Mode: {mode_label}", 'yellow'))
+        print(colored(f"🔤 Char Set: {self.current_char_set} ({self.char_sets[self.current_char_set][:10]}...)"
+                      f"{' calibrated' if self.calibrate else ''}", 'yellow'))
+        print(colored(f"🌈 Palette: {self.palette} | Dither: {self.dither} | Shape match: {'on' if self.shape_match else 'off'}", 'yellow'))
         print(colored(f"⚡ Adjustments: Contrast={self.contrast:.1f} Brightness={self.brightness:.1f}", 'yellow'))
-        print(colored(f"✨ Effects: Sharpness={self.sharpness:.1f} Edge={self.edge_intensity:.1f} Blur={self.blur_radius}", 'yellow'))
+        print(colored(f"✨ Effects: Sharpness={self.sharpness:.1f} Edge={self.edge_intensity:.1f} ({self.edge_backend}{', glyphs' if self.edge_glyphs else ''}) Blur={self.blur_radius}", 'yellow'))
+        if self.render_stats:
+            print(colored(f"📊 Last render: {self.render_stats['bytes'] / 1024:.1f} KB in {self.render_stats['time'] * 1000:.1f} ms"
+                          f"{' (cached)' if self.render_stats.get('cached') else ''}", 'yellow'))
+        if self.art_cache is not None:
+            print(colored(f"💾 Cache: {self.art_cache.summary()}", 'yellow'))
     
     def display_controls(self):
         print(colored("\n🎮 CONTROLS:", 'green', attrs=['bold']))
@@ -103,31 +212,20 @@ class UltimateASCIIArtConverter:
         lines = self.ascii_art.split('\n')
         preview_lines = min(15, len(lines))
         
+        # Tüm önizleme tek bir yazma çağrısıyla basılır
+        out = []
         for line in lines[:preview_lines]:
-            if self.current_color_mode == 'colored':
-                print(colored(line, 'green'))
-            elif self.current_color_mode == 'heatmap':
-                self.print_heatmap_line(line)
-            elif self.current_color_mode == 'edge':
-                print(colored(line, 'blue'))
+            # Color modes already carry their own escapes per run
+            if self.current_color_mode == 'edge':
+                out.append(colored(line, 'blue'))
             else:
-                print(line)
+                out.append(line)
+        sys.stdout.write("\n".join(out) + "\n")
+        sys.stdout.flush()
         
         if len(lines) > preview_lines:
             print(colored(f"\n... and {len(lines)-preview_lines} more lines", 'blue'))
     
-    def print_heatmap_line(self, line):
-        length = len(line)
-        for i, char in enumerate(line):
-            ratio = i / length
-            if ratio < 0.3:
-                print(colored(char, 'red'), end='')
-            elif ratio < 0.6:
-                print(colored(char, 'yellow'), end='')
-            else:
-                print(colored(char, 'green'), end='')
-        print()
-    
     def display_menu(self):
         self.clear_screen()
         self.display_header()
@@ -139,57 +237,41 @@ class UltimateASCIIArtConverter:
     
     # -------------------- Image Processing --------------------
     def apply_effects(self, img):
-        # Temel ayarlar
-        if self.contrast != 1.0:
-            img = ImageEnhance.Contrast(img).enhance(self.contrast)
-        if self.brightness != 1.0:
-            img = ImageEnhance.Brightness(img).enhance(self.brightness)
+        # Temel ayarlar (kontrast, parlaklık ve ters çevirme tek LUT geçişinde)
+        img = apply_point_ops(img, self.contrast, self.brightness,
+                              invert=self.current_color_mode == 'invert')
         if self.sharpness != 1.0:
             img = ImageEnhance.Sharpness(img).enhance(self.sharpness)
         
         # Özel efektler
-        if self.current_color_mode == 'invert':
-            img = ImageOps.invert(img)
-        elif self.current_color_mode == 'sepia':
+        if self.current_color_mode == 'sepia':
             img = self.apply_sepia(img)
+        elif self.current_color_mode == 'tone':
+            img = apply_color_matrix(img, COLOR_MATRICES[self.tone])
         elif self.current_color_mode == 'edge':
             img = self.detect_edges(img)
         elif self.current_color_mode == 'blur' and self.blur_radius > 0:
-            img = img.filter(ImageFilter.GaussianBlur(self.blur_radius))
+            img = img.filter(ImageFilter.GaussianBlur(self.blur_radius * self.pipeline_scale))
         
         return img
     
     def apply_sepia(self, img):
-        width, height = img.size
-        pixels = img.load()
-        
-        for py in range(height):
-            for px in range(width):
-                r, g, b = pixels[px, py]
-                tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-                tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-                tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-                pixels[px, py] = (min(255, tr), min(255, tg), min(255, tb))
-        
-        return img
+        return apply_color_matrix(img, COLOR_MATRICES['sepia'])
     
     def detect_edges(self, img):
-        img_np = np.array(img)
-        edges = feature.canny(img_np/255., sigma=self.edge_intensity)
-        return Image.fromarray((edges * 255).astype(np.uint8))
+        gray = np.array(img.convert('L'))
+        sigma = self.edge_intensity * self.pipeline_scale
+        return Image.fromarray(find_edges(gray, sigma, self.edge_backend))
     
     def process_gif(self, path):
-        self.animation_frames = []
-        self.is_animated = True
-        
+        # Kareler oynatılırken tembelce çözülür; aynı dosya ayar değişikliklerinde yeniden açılmaz
         try:
-            gif = Image.open(path)
-            for frame in range(0, gif.n_frames):
-                gif.seek(frame)
-                frame_img = gif.convert('RGB')
-                self.animation_frames.append(frame_img)
-            
-            print(colored(f"Loaded GIF with {len(self.animation_frames)} frames", 'green'))
+            if path != self.animation.path:
+                self.animation.max_pixels = self.source.max_pixels
+                self.animation.open(path)
+                self.frame_cache.clear()
+                print(colored(f"Loaded GIF with {self.animation.n_frames} frames", 'green'))
+            self.is_animated = True
             return True
         except Exception as e:
             print(colored(f"Error processing GIF: {str(e)}", 'red'))
@@ -201,36 +283,45 @@ class UltimateASCIIArtConverter:
             return
             
         try:
+            cache_key = None
             if img is None:
                 if self.image_path.lower().endswith('.gif'):
                     if not self.process_gif(self.image_path):
                         return
-                    img = self.animation_frames[0]
+                    img = self.animation.frame(0)
+                elif is_video(self.image_path):
+                    img = self.video_frame()
+                    self.is_animated = True
                 else:
-                    img = Image.open(self.image_path)
-            
-            # Renk moduna göre dönüşüm
-            if self.current_color_mode in ['none', 'grayscale', 'edge', 'blur', 'invert']:
-                img = img.convert('L')
-            elif self.current_color_mode == 'sepia':
-                img = img.convert('RGB')
-            
-            # Efekt uygula
-            img = self.apply_effects(img)
-            
-            # Boyutlandırma
-            width, height = img.size
-            aspect_ratio = height / width
-            new_width = int(self.output_width * self.zoom_level)
-            new_height = int(new_width * aspect_ratio * 0.55)
+                    self.is_animated = False
+                    if self.art_cache is not None:
+                        # Kalıcı önbellek: aynı içerik ve ayarlar diskten gelir
+                        start = time.perf_counter()
+                        self.ascii_art, hit = self.convert_source(
+                            lambda: self.source.get(self.image_path, decode_width(self.conversion_settings())),
+                            self.source_digest(self.image_path))
+                        self.render_stats = {
+                            'bytes': len(self.ascii_art.encode('utf-8')),
+                            'time': time.perf_counter() - start,
+                            'cached': hit
+                        }
+                        self.add_to_history()
+                        return
+                    img = self.source.get(self.image_path, decode_width(self.conversion_settings()))
+                cache_key = (self.image_path, self.source.version, self.cells_settings())
             
-            img = img.resize((new_width, new_height))
+            # Pikseller yalnızca işlemeyi etkileyen bir ayar değişince yeniden işlenir
+            if cache_key is None or cache_key != self.cells_key:
+                self.cells = self.process_cells(img)
+                self.cells_key = cache_key
             
             # ASCII dönüşümü
-            if self.current_color_mode == 'colored':
-                self.ascii_art = self.convert_to_colored_ascii(img)
-            else:
-                self.ascii_art = self.convert_to_grayscale_ascii(img)
+            start = time.perf_counter()
+            self.ascii_art = self.render_cells(self.cells)
+            self.render_stats = {
+                'bytes': len(self.ascii_art.encode('utf-8')),
+                'time': time.perf_counter() - start
+            }
             
             # Geçmişe ekle
             self.add_to_history()
@@ -238,61 +329,152 @@ class UltimateASCIIArtConverter:
         except Exception as e:
             self.ascii_art = f"Error: {str(e)}"
     
-    def convert_to_grayscale_ascii(self, img):
-        pixels = np.array(img)
-        chars = self.char_sets[self.current_char_set] or self.char_sets['basic']
-        char_len = len(chars)
-        
-        ascii_chars = []
-        for row in pixels:
-            line = [chars[min(int(pixel * (char_len - 1) / 255), char_len-1)] for pixel in row]
-            ascii_chars.append("".join(line))
-        
-        return "\n".join(ascii_chars)
-    
-    def convert_to_colored_ascii(self, img):
-        img_rgb = img.convert('RGB')
-        pixels = np.array(img_rgb)
-        chars = self.char_sets[self.current_char_set] or self.char_sets['basic']
-        char_len = len(chars)
-        
-        ascii_chars = []
-        for row in pixels:
-            line = []
-            for pixel in row:
-                r, g, b = pixel
-                gray = int(0.2989 * r + 0.5870 * g + 0.1140 * b)
-                char = chars[min(int(gray * (char_len - 1) / 255), char_len-1)]
-                
-                if self.palette == "vivid":
-                    color = self.rgb_to_ansi(r, g, b)
-                    line.append(f"\033[38;2;{r};{g};{b}m{char}\033[0m")
-                else:
-                    line.append(colored(char, self.get_ansi_color(r, g, b)))
-            
-            ascii_chars.append("".join(line))
+    def source_digest(self, path):
+        # Content hash of a source file, remembered while its size and mtime hold
+        info = os.stat(path)
+        key = (path, info.st_mtime_ns, info.st_size)
+        digest = self.digests.get(key)
+        if digest is None:
+            digest = file_digest(path)
+            self.digests.put(key, digest)
+        return digest
+    
+    def convert_source(self, load, digest=None):
+        # Art for a still image. With the persistent cache on, the source
+        # digest plus every output setting finds earlier results and load()
+        # only decodes the image on a miss. Returns (art, cache hit).
+        cache = self.art_cache
+        if cache is None or digest is None:
+            return self.convert_video_frame(load()), False
+        art_key = cache.key(digest, self.cells_settings(), self.render_settings())
+        art = cache.get_art(art_key)
+        if art is not None:
+            return art, True
+        cells = None
+        if cache.store_cells:
+            cells_key = cache.key(digest, self.cells_settings())
+            cells = cache.get_cells(cells_key)
+        if cells is None:
+            cells = self.process_cells(load())
+            if cache.store_cells:
+                cache.put_cells(cells_key, cells)
+        art = self.render_cells(cells)
+        cache.put_art(art_key, art)
+        return art, False
+    
+    def render_cells(self, cells):
+        if subpixel_mode(self.conversion_settings()):
+            return self.convert_to_subpixel_ascii(cells)
+        if self.current_color_mode in COLOR_MODES:
+            return self.convert_to_colored_ascii(cells)
+        if self.current_color_mode == 'heatmap':
+            return self.convert_to_heatmap_ascii(cells)
+        return self.convert_to_grayscale_ascii(cells)
+    
+    def convert_frame(self, index):
+        # Converted animation frames are cached per settings, so looping
+        # playback only converts on the first pass
+        key = (self.image_path, self.cells_settings(), self.render_settings(), index)
+        art = self.frame_cache.get(key)
+        if art is None:
+            art = self.render_cells(self.process_cells(self.animation.frame(index)))
+            self.frame_cache.put(key, art)
+        return art
+    
+    def cells_settings(self):
+        # Everything that changes the processed cells
+        return (self.output_width, self.zoom_level, subpixel_mode(self.conversion_settings()),
+                self.shape_match, self.pipeline_mode, self.contrast, self.brightness, self.sharpness,
+                self.effect_key())
+    
+    def render_settings(self):
+        # Everything that changes how cells become text
+        return (self.current_color_mode, self.char_sets[self.current_char_set], self.palette,
+                self.color_step, self.colormap, self.dither, self.edge_glyphs, self.calibrate,
+                self.glyph_font)
+    
+    def process_cells(self, img):
+        # Hedef ızgara boyutu (orijinal en-boy oranından)
+        settings = self.conversion_settings()
+        self.grid = grid_size(img.size, self.output_width, self.zoom_level)
+        cell_grid = self.grid
+        if subpixel_mode(settings):
+            cell_grid = subpixel_grid(self.grid, subpixel_mode(settings))
+        
+        # Hızlı modda efektlerden önce küçült
+        self.pipeline_scale = 1.0
+        if self.pipeline_mode == 'fast':
+            img, self.pipeline_scale = prescale(img, cell_grid, oversample(settings))
+        
+        # Renk moduna göre dönüşüm
+        if self.current_color_mode in ['edge', 'blur', 'invert']:
+            img = img.convert('L')
+        elif img.mode not in ['L', 'RGB']:
+            img = img.convert('RGB')
         
-        return "\n".join(ascii_chars)
+        # Efekt uygula
+        img = self.apply_effects(img)
+        
+        # Hücre istatistikleri (tüm ızgara için tek geçiş)
+        return CellGrid(img, cell_grid, glyph_tile(settings))
     
-    def rgb_to_ansi(self, r, g, b):
-        return f"\033[38;2;{r};{g};{b}m"
+    def effect_key(self):
+        # Settings that change the processed pixels for the current color mode;
+        # none/grayscale/colored/heatmap all share the same cells
+        mode = self.current_color_mode
+        if mode == 'edge':
+            return (mode, self.edge_intensity, self.edge_backend)
+        if mode == 'blur':
+            return (mode, self.blur_radius)
+        if mode == 'tone':
+            return (mode, self.tone)
+        if mode in ['invert', 'sepia']:
+            return (mode,)
+        return None
     
-    def get_ansi_color(self, r, g, b):
-        gray = (r + g + b) // 3
-        if gray < 60:
-            return 'grey'
-        elif gray < 120:
-            return 'blue'
-        elif gray < 180:
-            return 'green'
-        else:
-            return 'white'
+    def conversion_settings(self):
+        # Current settings in the mapping the shared ascii_engine helpers read
+        return {'width': self.output_width, 'zoom': self.zoom_level, 'pipeline': self.pipeline_mode,
+                'char_set': self.current_char_set,
+                'chars': self.char_sets[self.current_char_set] or self.char_sets['basic'],
+                'calibrate': self.calibrate, 'shape_match': self.shape_match, 'dither': self.dither,
+                'glyph_font': self.glyph_font}
+    
+    def convert_to_grayscale_ascii(self, cells):
+        settings = self.conversion_settings()
+        chars = active_chars(settings)
+        if self.current_color_mode != 'edge':
+            return render_chars(cell_gray(cells, chars, settings), chars)
+        
+        overlay = direction_glyphs(cells) if self.edge_glyphs else None
+        return render_chars(cell_gray(cells, chars, settings, normalize=True), chars, overlay=overlay)
+    
+    def convert_to_colored_ascii(self, cells):
+        settings = self.conversion_settings()
+        chars = active_chars(settings)
+        return render_colored(cells.colors(), chars, self.palette,
+                              color_step=self.color_step, gray=cell_gray(cells, chars, settings))
+    
+    def convert_to_heatmap_ascii(self, cells):
+        settings = self.conversion_settings()
+        chars = active_chars(settings)
+        return render_heatmap(cells.gray(), chars, self.colormap,
+                              glyphs=cell_gray(cells, chars, settings))
+    
+    def convert_to_subpixel_ascii(self, cells):
+        mode = subpixel_mode(self.conversion_settings())
+        gray = cells.gray(normalize=self.current_color_mode == 'edge')
+        if self.current_color_mode in COLOR_MODES:
+            return render_subpixels(gray, mode, self.dither, cells.colors(), self.palette, self.color_step)
+        if self.current_color_mode == 'heatmap':
+            return render_subpixels(gray, mode, self.dither, colormap_table(self.colormap)[heatmap_levels(gray)])
+        return render_subpixels(gray, mode, self.dither)
     
     # -------------------- Interactive Functions --------------------
     def load_image_interactive(self):
         self.clear_screen()
         print(colored("Enter image path or drag & drop file here:", 'cyan'))
-        print(colored("(Supports JPG, PNG, GIF, BMP)", 'blue'))
+        print(colored("(Supports JPG, PNG, GIF, BMP, MP4, AVI, MKV)", 'blue'))
         path = input("> ").strip('"\' ')
         
         if os.path.isfile(path):
@@ -328,7 +510,7 @@ class UltimateASCIIArtConverter:
         print(colored(title, 'cyan'))
         
         for i, (key, value) in enumerate(options.items()):
-            print(colored(f"{i+1}. {key}: {value}", 'yellow')))
+            print(colored(f"{i+1}. {key}: {value}", 'yellow'))
         
         print(colored("\nSelect an option (number) or ESC to cancel:", 'blue'))
         
@@ -347,19 +529,109 @@ class UltimateASCIIArtConverter:
     
     # -------------------- Advanced Features --------------------
     def play_animation(self):
-        if not self.animation_frames:
+        if is_video(self.image_path):
+            self.play_video()
+            return
+        if not self.animation.n_frames:
             return
             
-        self.clear_screen()
-        print(colored("Playing animation... Press ESC to stop", 'magenta'))
+        # Yalnızca değişen satırlar yeniden yazılır; zamanlayıcı hedef FPS'i korur
+        fps = self.target_fps or 1 / self.animation_speed
+        renderer = TerminalRenderer(max_rows=shutil.get_terminal_size().lines - 1)
+        scheduler = FrameScheduler(fps)
+        renderer.begin()
+        scheduler.start()
         
         frame_idx = 0
-        while not keyboard.is_pressed('esc'):
-            self.convert_image(self.animation_frames[frame_idx])
-            self.clear_screen()
-            print(self.ascii_art)
-            time.sleep(self.animation_speed)
-            frame_idx = (frame_idx + 1) % len(self.animation_frames)
+        try:
+            while not keyboard.is_pressed('esc'):
+                self.ascii_art = self.convert_frame(frame_idx)
+                renderer.draw(self.ascii_art)
+                frame_idx = (frame_idx + scheduler.wait()) % self.animation.n_frames
+        finally:
+            renderer.end()
+        self.report_playback(renderer, scheduler, fps)
+    
+    def report_playback(self, renderer, scheduler, fps):
+        print(colored(f"Played {scheduler.shown} frames at {scheduler.fps():.1f} FPS "
+                      f"(target {fps:.1f}), dropped {scheduler.dropped}, "
+                      f"{renderer.bytes / max(1, renderer.frames):.0f} bytes/frame", 'cyan'))
+        time.sleep(1)
+    
+    # -------------------- Video --------------------
+    def video_frame(self):
+        # First frame stands in for the video in the preview
+        if self.video_preview is None or self.video_preview[0] != self.image_path:
+            self.video_preview = (self.image_path, read_video_frame(self.image_path))
+        return self.video_preview[1]
+    
+    def convert_video_frame(self, img):
+        # One decoded frame straight to text (video and raw streams; runs on
+        # the stream's conversion thread for videos)
+        return self.render_cells(self.process_cells(img))
+    
+    def play_video(self):
+        # Gerçek zamanlı: geride kalınca kareler çözülmeden atlanır
+        stream = VideoStream(self.image_path, self.convert_video_frame)
+        fps = self.target_fps or stream.fps
+        renderer = TerminalRenderer(max_rows=shutil.get_terminal_size().lines - 1)
+        scheduler = FrameScheduler(fps)
+        renderer.begin()
+        scheduler.start()
+        
+        try:
+            for index, art in stream:
+                if keyboard.is_pressed('esc'):
+                    break
+                self.ascii_art = art
+                renderer.draw(art)
+                stream.skip_to(index + scheduler.wait())
+        finally:
+            stream.close()
+            renderer.end()
+        self.report_playback(renderer, scheduler, fps)
+    
+    # -------------------- Export --------------------
+    def export_animation(self, output_path):
+        # Offline: every frame converted in order and written as it arrives.
+        # The format follows the extension (.cast, .html, otherwise text).
+        start = time.perf_counter()
+        pool = None
+        if is_video(self.image_path):
+            fps = self.target_fps or video_fps(self.image_path)
+            if self.workers > 1:
+                pool = FramePool(self.convert_video_frame, self.workers)
+                frames = pool.map(img for index, img in video_frames(self.image_path))
+            else:
+                frames = (art for index, art in VideoStream(self.image_path, self.convert_video_frame))
+        else:
+            if not self.process_gif(self.image_path):
+                return 0
+            # Straight from the decoder, bypassing the playback caches
+            fps = self.target_fps or 1 / self.animation_speed
+            decoded = (img for index, img in self.animation.decode())
+            if self.workers > 1:
+                pool = FramePool(self.convert_video_frame, self.workers)
+                frames = pool.map(decoded)
+            else:
+                frames = (self.convert_video_frame(img) for img in decoded)
+        
+        recorder_class = RECORDERS.get(os.path.splitext(output_path)[1].lower(), TextRecorder)
+        try:
+            with recorder_class(output_path, fps) as recorder:
+                for art in frames:
+                    recorder.add(art)
+        finally:
+            if pool is not None:
+                pool.close()
+        
+        elapsed = time.perf_counter() - start
+        workers = f", {self.workers} workers" if pool is not None else ""
+        print(colored(f"Exported {recorder.frames} frames to {output_path} in {elapsed:.1f}s "
+                      f"({recorder.frames / max(elapsed, 1e-9):.1f} frames/s{workers})", 'green'))
+        print(colored(f"{recorder.bytes / 1024:.0f} KB written, {recorder.keyframes} keyframes "
+                      f"({recorder.full_bytes / 1024:.0f} KB as full frames)", 'cyan'))
+        return recorder.frames
     
     def add_to_history(self):
         if len(self.history) >= self.max_history:
@@ -403,7 +675,10 @@ class UltimateASCIIArtConverter:
         print("2. HTML file (.html)")
         print("3. Image file (.png)")
         print("4. JSON file (.json)")
-        print(colored("\nEnter choice (1-4) or ESC to cancel:", 'blue'))
+        if self.is_animated:
+            print("5. Animation recording (.cast)")
+            print("6. Animation player (.html)")
+        print(colored(f"\nEnter choice (1-{6 if self.is_animated else 4}) or ESC to cancel:", 'blue'))
         
         choice = keyboard.read_key()
         if choice == 'esc':
@@ -415,68 +690,47 @@ class UltimateASCIIArtConverter:
             return
         
         try:
-            if choice == '1':
-                with open(f"{filename}.txt", "w", encoding="utf-8") as f:
-                    f.write(self.ascii_art)
-                print(colored(f"Saved to {filename}.txt", 'green'))
+            if choice in SAVE_FORMATS:
+                fmt = SAVE_FORMATS[choice]
+                print(colored(f"Saved to {self.write_art(f'{filename}.{fmt}', fmt)}", 'green'))
             
-            elif choice == '2':
-                with open(f"{filename}.html", "w", encoding="utf-8") as f:
-                    f.write(f"<html><body style='background:{self.save_config['bg_color']};'>")
-                    f.write(f"<pre style='color:white;font-size:{self.save_config['font_size']}px;'>")
-                    f.write(self.ascii_art)
-                    f.write("</pre></body></html>")
-                print(colored(f"Saved to {filename}.html", 'green'))
-            
-            elif choice == '3':
-                self.save_as_image(filename)
-            
-            elif choice == '4':
-                data = {
-                    'ascii': self.ascii_art,
-                    'settings': {
-                        'width': self.output_width,
-                        'chars': self.current_char_set,
-                        'color': self.current_color_mode,
-                        'zoom': self.zoom_level
-                    }
-                }
-                with open(f"{filename}.json", "w") as f:
-                    json.dump(data, f)
-                print(colored(f"Saved to {filename}.json", 'green'))
+            elif choice in ('5', '6') and self.is_animated:
+                self.export_animation(f"{filename}.cast" if choice == '5' else f"{filename}.html")
             
             time.sleep(1)
         except Exception as e:
             print(colored(f"Error saving file: {str(e)}", 'red'))
             time.sleep(1)
     
-    def save_as_image(self, filename):
-        try:
-            # ASCII sanatını görsele dönüştür
-            font_size = 10
-            lines = self.ascii_art.split('\n')
-            img_height = len(lines) * font_size
-            img_width = max(len(line) for line in lines) * font_size // 2
-            
-            plt.figure(figsize=(img_width/100, img_height/100), dpi=100)
-            plt.text(0.5, 0.5, self.ascii_art, 
-                    fontfamily='monospace', 
-                    fontsize=font_size, 
-                    ha='left', 
-                    va='top',
-                    color='white')
-            plt.axis('off')
-            plt.gcf().set_facecolor('black')
-            plt.savefig(f"{filename}.png", 
-                      bbox_inches='tight', 
-                      pad_inches=0.1, 
-                      facecolor='black',
-                      dpi=300)
-            plt.close()
-            
-            print(colored(f"Saved to {filename}.png", 'green'))
-        except Exception as e:
-            print(colored(f"Error creating image: {str(e)}", 'red'))
+    def write_art(self, path, fmt):
+        # Current art to `path` as txt, html, png or json; errors propagate
+        if fmt == 'png':
+            # ASCII sanatını kalibrasyonda kullanılan fontla görsele dönüştür
+            img = render_text_image(self.ascii_art, self.glyph_font, self.save_config['font_size'],
+                                    bg=self.save_config['bg_color'])
+            img.save(path)
+        elif fmt == 'html':
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"<html><body style='background:{self.save_config['bg_color']};'>")
+                f.write(f"<pre style='color:white;font-size:{self.save_config['font_size']}px;'>")
+                f.write(self.ascii_art)
+                f.write("</pre></body></html>")
+        elif fmt == 'json':
+            data = {
+                'ascii': self.ascii_art,
+                'settings': {
+                    'width': self.output_width,
+                    'chars': self.current_char_set,
+                    'color': self.current_color_mode,
+                    'zoom': self.zoom_level
+                }
+            }
+            with open(path, "w") as f:
+                json.dump(data, f)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.ascii_art)
+        return path
     
     def copy_to_clipboard(self):
         try:
@@ -502,11 +756,11 @@ class UltimateASCIIArtConverter:
         print(colored("Created with Python 3.9+", 'blue'))
         print("\nFeatures:")
         print("- Supports multiple image formats (JPG, PNG, GIF, BMP)")
-        print("- 8 different color modes")
+        print("- 9 different color modes")
         print("- 5 character sets + custom")
         print("- Real-time adjustments (contrast, brightness, sharpness)")
-        print("- Special effects (blur, edge detection, sepia)")
-        print("- Animation support for GIFs")
+        print("- Special effects (blur, edge detection, sepia, warm/cool/duotone tones)")
+        print("- Animation support for GIFs and videos")
         print("- Multiple save formats (TXT, HTML, PNG, JSON)")
         print("- Full undo/redo history")
         print("\nPress any key to return...")
@@ -539,6 +793,351 @@ class UltimateASCIIArtConverter:
         except:
             print(colored("Error saving config", 'red'))
     
+    # -------------------- Pipe Mode --------------------
+    def run_pipe(self, stream, out, raw_size=None):
+        # stdin -> stdout without the interactive loop. Either one encoded
+        # image, or raw rgb24 frames converted one at a time.
+        if raw_size:
+            width, height = raw_size
+            for frame in read_raw_frames(stream, width, height):
+                out.write(self.convert_video_frame(frame).encode('utf-8'))
+                out.write(FRAME_SEPARATOR.encode('utf-8'))
+                out.flush()
+            return
+        
+        if self.image_path and self.image_path != '-':
+            digest = self.source_digest(self.image_path) if self.art_cache else None
+            art, _ = self.convert_source(lambda: self.source.get(self.image_path, decode_width(self.conversion_settings())), digest)
+        else:
+            data = stream.read()
+            digest = hashlib.sha1(data).hexdigest() if self.art_cache else None
+            art, _ = self.convert_source(
+                lambda: load_image(io.BytesIO(data), decode_width(self.conversion_settings()), self.source.max_pixels)[0], digest)
+        out.write(art.encode('utf-8') + b'\n')
+        out.flush()
+    
+    # -------------------- Batch Mode --------------------
+    def add_job(self, jobs, path, output_path, item=None):
+        if output_path not in jobs:
+            jobs[output_path] = (path, item)
+        elif jobs[output_path][0] != path:
+            print(colored(f"Skipping {path}: {output_path} already comes from {jobs[output_path][0]}",
+                          'yellow'), file=sys.stderr)
+    
+    def batch_jobs(self, inputs, output_dir, fmt):
+        # Files, directories (searched recursively) and glob patterns ->
+        # (input path, output path, None). Outputs keep the path below the
+        # directory they were found in.
+        jobs = {}
+        for pattern in inputs:
+            if os.path.isdir(pattern):
+                found = [(path, os.path.relpath(path, pattern))
+                         for path in glob.glob(os.path.join(glob.escape(pattern), '**', '*'), recursive=True)]
+            else:
+                found = [(path, os.path.basename(path)) for path in glob.glob(pattern, recursive=True)]
+                if not found:
+                    print(colored(f"No files match {pattern}", 'yellow'), file=sys.stderr)
+            for path, name in sorted(found):
+                if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                    self.add_job(jobs, path, os.path.join(output_dir, f"{os.path.splitext(name)[0]}.{fmt}"))
+        return [(path, output_path, item) for output_path, (path, item) in jobs.items()]
+    
+    def manifest_jobs(self, manifest, shard, output_dir, fmt):
+        # This shard's manifest items -> (input path, output path, item).
+        # "output" names the file below output_dir, the input's name otherwise.
+        jobs = {}
+        for item in read_manifest(manifest, shard):
+            name = item.get('output') or os.path.basename(item['input'])
+            self.add_job(jobs, item['input'], os.path.join(output_dir, f"{os.path.splitext(name)[0]}.{fmt}"), item)
+        return [(path, output_path, item) for output_path, (path, item) in jobs.items()]
+    
+    def check_overrides(self, overrides):
+        # Names, choices and types must match the attributes they replace
+        choices = {'color_mode': self.color_modes, 'char_set': self.char_sets, 'palette': self.palettes,
+                   'colormap': self.colormaps, 'dither': DITHER_MODES}
+        for name, value in overrides.items():
+            if name not in MANIFEST_SETTINGS:
+                raise ValueError(f"Unknown setting {name!r} (one of: {', '.join(MANIFEST_SETTINGS)})")
+            current = getattr(self, MANIFEST_SETTINGS[name])
+            if isinstance(current, bool):
+                if not isinstance(value, bool):
+                    raise ValueError(f"{name} must be true or false, got {value!r}")
+            elif isinstance(current, (int, float)):
+                allowed = int if isinstance(current, int) else (int, float)
+                if isinstance(value, bool) or not isinstance(value, allowed):
+                    kind = 'an integer' if allowed is int else 'a number'
+                    raise ValueError(f"{name} must be {kind}, got {value!r}")
+                if value <= 0:
+                    raise ValueError(f"{name} must be positive, got {value!r}")
+                if name == 'color_step' and value > 255:
+                    raise ValueError(f"color_step must be between 1 and 255, got {value!r}")
+            if name in choices and value not in choices[name]:
+                raise ValueError(f"{name} must be one of: {', '.join(choices[name])}")
+    
+    def apply_overrides(self, overrides):
+        # Per-item manifest settings; returns the values they replaced
+        self.check_overrides(overrides)
+        previous = {MANIFEST_SETTINGS[name]: getattr(self, MANIFEST_SETTINGS[name]) for name in overrides}
+        self.apply_settings({MANIFEST_SETTINGS[name]: value for name, value in overrides.items()})
+        return previous
+    
+    def convert_file(self, path, output_path, fmt, overrides=None):
+        # One image file to one output file; runs in the batch workers
+        start = time.perf_counter()
+        previous = self.apply_overrides(overrides or {})
+        try:
+            digest = file_digest(path) if self.art_cache else None
+            self.ascii_art, hit = self.convert_source(
+                lambda: load_image(path, decode_width(self.conversion_settings()), self.source.max_pixels)[0], digest)
+            self.write_art(output_path, fmt)
+        finally:
+            self.apply_settings(previous)
+        return os.path.getsize(output_path), time.perf_counter() - start, hit
+    
+    def warm_up(self):
+        # Char ramps and palette tables are built once here; forked workers
+        # inherit them, others keep them after their first file
+        active_chars(self.conversion_settings())
+        if self.current_color_mode in COLOR_MODES and self.palette != 'vivid':
+            palette_lut(self.palette)
+        if self.current_color_mode == 'heatmap':
+            colormap_table(self.colormap)
+    
+    def run_batch(self, jobs, fmt, checkpoint=None):
+        # Headless: no keyboard or screen handling, progress is streamed
+        # line by line. Items the checkpoint log has as done are skipped and
+        # every finished item is appended to it. Returns the failure count.
+        if checkpoint is not None:
+            pending = [job for job in jobs if not checkpoint.done(job[1])]
+            if len(pending) < len(jobs):
+                print(colored(f"Skipping {len(jobs) - len(pending)} items already done "
+                              f"according to {checkpoint.path}", 'cyan'))
+            jobs = pending
+        for path, output_path, item in jobs:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        self.warm_up()
+        
+        start = time.perf_counter()
+        done = failed = written = hits = 0
+        pool = worker_pool(self.convert_file, self.workers) if self.workers > 1 else None
+        try:
+            if pool is not None:
+                futures = {pool.submit(call_worker, path, output_path, fmt, (item or {}).get('settings')):
+                           (path, output_path, item) for path, output_path, item in jobs}
+                tasks = ((futures[future], future.result) for future in as_completed(futures))
+            else:
+                tasks = (((path, output_path, item),
+                          partial(self.convert_file, path, output_path, fmt, (item or {}).get('settings')))
+                         for path, output_path, item in jobs)
+            for (path, output_path, item), result in tasks:
+                done += 1
+                try:
+                    size, elapsed, hit = result()
+                except Exception as e:
+                    failed += 1
+                    print(colored(f"[{done}/{len(jobs)}] FAILED {path}: {e}", 'red'), file=sys.stderr)
+                    if checkpoint is not None:
+                        checkpoint.record(input=path, output=output_path, status='failed',
+                                          error=str(e), item=item)
+                    continue
+                written += size
+                hits += hit
+                print(f"[{done}/{len(jobs)}] {path} -> {output_path} ({elapsed * 1000:.0f} ms"
+                      f"{', cached' if hit else ''})", flush=True)
+                if checkpoint is not None:
+                    checkpoint.record(input=path, output=output_path, status='ok',
+                                      bytes=size, seconds=round(elapsed, 4), item=item)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        
+        elapsed = time.perf_counter() - start
+        print(colored(f"Converted {done - failed} of {len(jobs)} files in {elapsed:.1f}s "
+                      f"({(done - failed) / max(elapsed, 1e-9):.1f} files/s, {self.workers} workers), "
+                      f"{written / 1024 ** 2:.1f} MB written, {failed} failed",
+                      'green' if not failed else 'yellow'))
+        if self.art_cache is not None:
+            print(colored(f"Cache: {hits} of {done - failed} files served from {self.art_cache.root}", 'cyan'))
+        return failed
+    
+    def checkpoint_path(self, manifest, shard, output_dir):
+        name = os.path.splitext(os.path.basename(manifest))[0]
+        return os.path.join(output_dir, '.checkpoints', f"{name}.shard-{shard[0]}-of-{shard[1]}.jsonl")
+    
+    def run_merge(self, paths, manifest=None, failed_path=None, output_dir=None, fmt='txt'):
+        # Per-shard and total stats from checkpoint logs (files, or
+        # directories holding them). Optionally counts manifest items not
+        # done yet and writes the failed ones out as a manifest to retry.
+        logs = []
+        for path in paths:
+            if os.path.isdir(path):
+                logs += sorted(glob.glob(os.path.join(glob.escape(path), '*.jsonl')) +
+                               glob.glob(os.path.join(glob.escape(path), '.checkpoints', '*.jsonl')))
+            else:
+                logs.append(path)
+        if not logs:
+            print(colored("No checkpoint logs found", 'yellow'), file=sys.stderr)
+            return 1
+        
+        stats, totals, final = merge_checkpoints(logs)
+        for path, entry in list(stats.items()) + [('total', totals)]:
+            print(colored(f"{path}: {entry['ok']} ok, {entry['failed']} failed, "
+                          f"{entry['bytes'] / 1024 ** 2:.1f} MB, {entry['seconds']:.1f}s converting",
+                          'green' if path == 'total' else 'cyan'))
+        
+        if manifest:
+            # The outputs the batch would write for the whole manifest (one
+            # per output, like manifest_jobs) against the ones logged as ok
+            if output_dir is None:
+                output_dir = self.merge_output_dir(paths[0])
+            finished = {os.path.abspath(output) for output, record in final.items() if record['status'] == 'ok'}
+            expected = [os.path.abspath(output_path)
+                        for path, output_path, item in self.manifest_jobs(manifest, (1, 1), output_dir, fmt)]
+            remaining = sum(output_path not in finished for output_path in expected)
+            print(colored(f"{len(expected)} manifest items, {remaining} not done yet",
+                          'yellow' if remaining else 'green'))
+        
+        if failed_path:
+            with open(failed_path, 'w', encoding='utf-8') as f:
+                for record in final.values():
+                    if record['status'] == 'failed':
+                        f.write(json.dumps(record.get('item') or {'input': record['input']},
+                                           ensure_ascii=False) + '\n')
+            print(colored(f"{totals['failed']} failed items written to {failed_path}", 'cyan'))
+        return 0
+    
+    def merge_output_dir(self, path):
+        # Batch output directory a merge argument belongs to: the directory
+        # itself, or the one holding the .checkpoints folder of a log
+        if os.path.isdir(path):
+            return path
+        log_dir = os.path.dirname(path)
+        if os.path.basename(log_dir) == '.checkpoints':
+            return os.path.dirname(log_dir)
+        return log_dir or '.'
+    
+    # -------------------- Watch Mode --------------------
+    def watch_output(self, root, path, fmt, output_dir=None):
+        # photo.jpg -> photo.ascii.txt next to it, or below output_dir
+        stem = os.path.splitext(path)[0]
+        if output_dir:
+            stem = os.path.join(output_dir, os.path.relpath(stem, root))
+        return f"{stem}.ascii.{fmt}"
+    
+    def run_watch(self, root, fmt, output_dir=None, interval=1.0, settle=WATCH_SETTLE,
+                  idle_timeout=60.0, stop=None):
+        # Long-running: converts new and modified images under root until
+        # interrupted (or `stop` is set). Workers are started on demand and
+        # stopped again after idle_timeout seconds without work.
+        watcher = FolderWatcher(root, IMAGE_EXTENSIONS, settle,
+                                skip=lambda path: os.path.splitext(path)[0].endswith('.ascii'))
+        # Files whose output is already newer are not converted again
+        for path, signature in watcher.files():
+            output_path = self.watch_output(root, path, fmt, output_dir)
+            if os.path.exists(output_path) and os.path.getmtime(output_path) >= signature[0] / 1e9:
+                watcher.mark_done(path, signature)
+        print(colored(f"Watching {root} ({len(watcher.done)} files up to date), Ctrl+C to stop", 'cyan'))
+        self.warm_up()
+        
+        pool = None
+        running = {}
+        converted = failed = 0
+        last_work = time.monotonic()
+        try:
+            while stop is None or not stop.is_set():
+                for path, signature, digest in watcher.poll():
+                    output_path = self.watch_output(root, path, fmt, output_dir)
+                    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+                    if self.workers > 1:
+                        if pool is None:
+                            pool = worker_pool(self.convert_file, self.workers)
+                        future = pool.submit(call_worker, path, output_path, fmt)
+                    else:
+                        future = Future()
+                        try:
+                            future.set_result(self.convert_file(path, output_path, fmt))
+                        except Exception as e:
+                            future.set_exception(e)
+                    running[future] = (path, signature, digest, output_path)
+                
+                for future in [future for future in running if future.done()]:
+                    path, signature, digest, output_path = running.pop(future)
+                    # Failed files are retried once they change again
+                    watcher.mark_done(path, signature, digest)
+                    last_work = time.monotonic()
+                    try:
+                        size, elapsed, hit = future.result()
+                    except Exception as e:
+                        failed += 1
+                        print(colored(f"FAILED {path}: {e}", 'red'), file=sys.stderr)
+                        continue
+                    converted += 1
+                    print(f"{path} -> {output_path} ({elapsed * 1000:.0f} ms{', cached' if hit else ''})",
+                          flush=True)
+                
+                if pool is not None and not running and time.monotonic() - last_work > idle_timeout:
+                    pool.shutdown()
+                    pool = None
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        print(colored(f"Stopped watching: {converted} converted, {failed} failed", 'cyan'))
+        return failed
+    
+    # -------------------- HTTP Service --------------------
+    def parse_settings(self, query):
+        # Query string pairs -> manifest-style overrides, typed like the
+        # attributes they replace; raises ValueError for anything unknown
+        overrides = {}
+        for name, text in query:
+            if name not in MANIFEST_SETTINGS:
+                raise ValueError(f"Unknown setting {name!r} (one of: {', '.join(MANIFEST_SETTINGS)})")
+            current = getattr(self, MANIFEST_SETTINGS[name])
+            if isinstance(current, bool):
+                overrides[name] = text.lower() in ('1', 'true', 'yes', 'on')
+            elif isinstance(current, (int, float)):
+                overrides[name] = type(current)(text)
+            else:
+                overrides[name] = text
+        self.check_overrides(overrides)
+        return overrides
+    
+    def convert_bytes(self, data, overrides=None):
+        # One encoded image to text; runs in the service workers
+        previous = self.apply_overrides(overrides or {})
+        try:
+            digest = hashlib.sha1(data).hexdigest() if self.art_cache else None
+            return self.convert_source(
+                lambda: load_image(io.BytesIO(data), decode_width(self.conversion_settings()), self.source.max_pixels)[0], digest)
+        finally:
+            self.apply_settings(previous)
+    
+    def run_server(self, host, port, queue_size=SERVICE_QUEUE_SIZE, max_body=MAX_REQUEST_BYTES):
+        # Serves until interrupted. Workers start (and warm their caches)
+        # before the socket is opened.
+        self.warm_up()
+        service = ConversionService(self.convert_bytes, self.workers, queue_size)
+        sample = io.BytesIO()
+        Image.new('RGB', (64, 64), 'gray').save(sample, 'PNG')
+        service.warm(sample.getvalue())
+        
+        server = ThreadingHTTPServer((host, port), ConversionHandler)
+        server.converter = self
+        server.service = service
+        server.max_body = max_body
+        print(colored(f"Serving on http://{server.server_address[0]}:{server.server_address[1]} "
+                      f"({service.workers} workers, queue {queue_size}), Ctrl+C to stop", 'cyan'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.close()
+    
     # -------------------- Main Loop --------------------
     def run(self):
         self.clear_screen()
@@ -556,6 +1155,10 @@ class UltimateASCIIArtConverter:
                     self.convert_image()
                 elif keyboard.is_pressed('c'):  # Color mode
                     mode = self.select_from_menu("Select Color Mode", self.color_modes)
+                    if mode == 'tone':
+                        self.tone = self.select_from_menu("Select Tone", self.tones) or self.tone
+                    elif mode == 'heatmap':
+                        self.colormap = self.select_from_menu("Select Colormap", self.colormaps) or self.colormap
                     if mode:
                         self.current_color_mode = mode
                         self.convert_image()
@@ -578,12 +1181,7 @@ class UltimateASCIIArtConverter:
                 elif keyboard.is_pressed('v'):  # View fullscreen
                     self.show_fullscreen()
                 elif keyboard.is_pressed('p'):  # Palette
-                    self.palette = self.select_from_menu("Select Palette", {
-                        'default': "Basic colors",
-                        'vivid': "True RGB colors",
-                        'grayscale': "Grayscale",
-                        'retro': "Retro terminal"
-                    }) or self.palette
+                    self.palette = self.select_from_menu("Select Palette", self.palettes) or self.palette
                     self.convert_image()
                 elif keyboard.is_pressed('a') and self.is_animated:  # Animation
                     self.play_animation()
@@ -616,19 +1214,269 @@ class UltimateASCIIArtConverter:
                 print(colored(f"Error: {str(e)}", 'red'))
                 time.sleep(1)
 
-if __name__ == "__main__":
-    converter = UltimateASCIIArtConverter()
+class ConversionHandler(BaseHTTPRequestHandler):
+    # POST /convert with the image as the body and settings in the query
+    # string (width, color_mode, char_set, palette, ..., format=txt|json);
+    # GET /metrics and /health
+    protocol_version = 'HTTP/1.1'
+    
+    def send(self, status, body, content_type='text/plain; charset=utf-8', headers=()):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
     
+    def send_json(self, status, data):
+        self.send(status, json.dumps(data, ensure_ascii=False), 'application/json')
+    
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/metrics':
+            self.send_json(200, self.server.service.metrics())
+        elif path == '/health':
+            self.send(200, "ok\n")
+        else:
+            self.send(404, "Not found\n")
+    
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        length = self.headers.get('Content-Length', '0')
+        length = int(length) if length.isdigit() else 0
+        if url.path != '/convert':
+            # The body is left unread, so this connection can't be reused
+            self.close_connection = True
+            self.send(404, "Not found\n")
+            return
+        if not 0 < length <= self.server.max_body:
+            self.close_connection = True
+            self.send(413 if length else 411, f"Send the image as a body of at most "
+                                              f"{self.server.max_body} bytes\n")
+            return
+        data = self.rfile.read(length)
+        
+        query = parse_qsl(url.query)
+        fmt = dict(query).get('format', 'txt')
+        try:
+            if fmt not in ('txt', 'json'):
+                raise ValueError("format must be txt or json")
+            overrides = self.server.converter.parse_settings(
+                [(name, value) for name, value in query if name != 'format'])
+        except ValueError as e:
+            self.send(400, f"{e}\n")
+            return
+        
+        # Aynı görsel ve ayarlarla gelen eşzamanlı istekler tek dönüşümü paylaşır
+        key = (hashlib.sha1(data).hexdigest(), json.dumps(overrides, sort_keys=True))
+        try:
+            future, coalesced = self.server.service.submit(key, data, overrides)
+            art, cached = future.result()
+        except ServiceBusy as e:
+            self.send(503, f"Busy: {e}\n", headers=[('Retry-After', '1')])
+            return
+        except Exception as e:
+            self.server.service.record(time.perf_counter() - start, ok=False)
+            self.send(422, f"Cannot convert: {e}\n")
+            return
+        
+        elapsed = time.perf_counter() - start
+        self.server.service.record(elapsed)
+        if fmt == 'json':
+            self.send_json(200, {'ascii': art, 'cached': cached, 'coalesced': coalesced,
+                                 'ms': round(elapsed * 1000, 2)})
+        else:
+            self.send(200, art)
+
+
+if __name__ == "__main__":
     # Komut satırı argümanları
-    parser = argparse.ArgumentParser(description='Ultimate ASCII Art Converter Pro')
-    parser.add_argument('-i', '--image', help='Path to image file')
-    parser.add_argument('-w', '--width', type=int, help='Output width')
+    # Dönüşüm ayarları hem tek görsel hem de batch komutunda geçerli
+    settings = argparse.ArgumentParser(add_help=False)
+    settings.add_argument('-w', '--width', type=int, help='Output width')
+    settings.add_argument('-c', '--color-mode', help='Color mode (none, grayscale, colored, edge, ...)')
+    settings.add_argument('-k', '--char-set', help='Character set (basic, extended, blocks, braille, ...)')
+    settings.add_argument('--palette', help='Palette for the colored mode (default, vivid, ansi16, ...)')
+    settings.add_argument('--pipeline', choices=PIPELINE_MODES, default='fast',
+                          help="'fast' downsamples before effects, 'quality' processes at full resolution")
+    settings.add_argument('--max-pixels', type=int, default=MAX_IMAGE_PIXELS,
+                          help='Refuse images that would decode to more pixels than this')
+    settings.add_argument('--edge-backend', choices=EDGE_BACKENDS, default='cv2',
+                          help='Edge detector used by the edge color mode')
+    settings.add_argument('--edge-glyphs', action='store_true',
+                          help='Draw edges with - | / \\ glyphs following their direction')
+    settings.add_argument('--colormap', choices=list(COLORMAP_STOPS), default='inferno',
+                          help='Colormap used by the heatmap color mode')
+    settings.add_argument('--color-step', type=int, default=1,
+                          help='Quantize truecolor output to this step (1-255) to merge similar colors')
+    settings.add_argument('--dither', choices=DITHER_MODES, default='none',
+                          help='Ordered dither applied before characters are picked')
+    settings.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                          help='Processes converting in parallel for --export and batch (1 = in-process)')
+    settings.add_argument('--shape-match', action='store_true',
+                          help='Pick characters by matching glyph shapes instead of brightness alone')
+    settings.add_argument('--glyph-font',
+                          help='TrueType font used for glyph shapes, density calibration and saved images '
+                               '(default: DejaVu Sans Mono)')
+    settings.add_argument('--no-calibrate', action='store_true',
+                          help='Use char sets in their hand-ordered ramp instead of measured glyph density')
+    settings.add_argument('--cache', action='store_true',
+                          help='Keep converted still images in a persistent cache keyed by content and settings')
+    settings.add_argument('--cache-cells', action='store_true',
+                          help='With --cache: also keep the processed cell grids, reused across render settings')
+    settings.add_argument('--cache-size', type=int, default=ART_CACHE_SIZE // 1024 ** 2, metavar='MB',
+                          help='Evict least recently used cache entries beyond this size')
+    
+    parser = argparse.ArgumentParser(description='Ultimate ASCII Art Converter Pro', parents=[settings])
+    parser.add_argument('-i', '--image', help="Path to image file ('-' for stdin with --pipe)")
+    parser.add_argument('--pipe', action='store_true',
+                        help='Read the image (or stdin) and write the art to stdout, no interactive loop')
+    parser.add_argument('--raw', type=parse_frame_size, metavar='WIDTHxHEIGHT',
+                        help='With --pipe: read raw rgb24 frames of this size from stdin, '
+                             'one converted frame per form feed')
+    parser.add_argument('--fps', type=float,
+                        help="Target playback frame rate (default: 10 for GIFs, the file's rate for videos)")
+    parser.add_argument('--export', '--video-out', dest='export',
+                        help='Convert every frame of the --image GIF or video and exit: .cast (asciicast v2), '
+                             '.html (self-contained player), otherwise text with form feeds between frames')
+    commands = parser.add_subparsers(dest='command')
+    batch = commands.add_parser('batch', parents=[settings],
+                                help='Convert many images headlessly across a process pool')
+    batch.add_argument('inputs', nargs='*', help='Image files, directories or glob patterns')
+    batch.add_argument('-o', '--output-dir', required=True, help='Directory the converted files go to')
+    batch.add_argument('-f', '--format', choices=list(SAVE_FORMATS.values()), default='txt',
+                       help='Output format')
+    batch.add_argument('--manifest',
+                       help='JSONL job list ({"input": ..., "output": ..., "settings": {...}} per line) '
+                            'instead of inputs; progress is checkpointed so a rerun resumes')
+    batch.add_argument('--shard', type=parse_shard, default=(1, 1), metavar='I/N',
+                       help='With --manifest: convert only shard I of N (1-based)')
+    watch = commands.add_parser('watch', parents=[settings],
+                                help='Keep converting new and modified images in a folder tree')
+    watch.add_argument('folder', help='Directory to watch (recursively)')
+    watch.add_argument('-o', '--output-dir', help='Write renditions here instead of next to the images')
+    watch.add_argument('-f', '--format', choices=list(SAVE_FORMATS.values()), default='txt',
+                       help='Output format (photo.jpg -> photo.ascii.txt)')
+    watch.add_argument('--interval', type=float, default=1.0, help='Seconds between scans')
+    watch.add_argument('--settle', type=float, default=WATCH_SETTLE,
+                       help='Seconds a file must stay unchanged before it is converted')
+    watch.add_argument('--idle-timeout', type=float, default=60.0,
+                       help='Stop the worker processes after this many idle seconds')
+    watch.set_defaults(workers=min(2, os.cpu_count() or 1))
+    cache = commands.add_parser('cache', help='Show the size of the conversion cache, or clear it')
+    cache.add_argument('--clear', action='store_true', help='Delete every cached entry')
+    serve = commands.add_parser('serve', parents=[settings],
+                                help='Convert images posted over HTTP (POST /convert, GET /metrics)')
+    serve.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    serve.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    serve.add_argument('--queue-size', type=int, default=SERVICE_QUEUE_SIZE,
+                       help='Distinct conversions queued or running before requests get 503')
+    serve.add_argument('--max-body', type=int, default=MAX_REQUEST_BYTES,
+                       help='Largest accepted image upload in bytes')
+    merge = commands.add_parser('merge', help='Combine the stats of batch checkpoint logs')
+    merge.add_argument('logs', nargs='+', help='Checkpoint logs, or batch output directories')
+    merge.add_argument('--manifest', help='Also count the items of this manifest not done yet')
+    merge.add_argument('--failed', help='Write the failed items to this file as a manifest to retry')
+    merge.add_argument('-o', '--output-dir',
+                       help='Output directory of the batch (default: inferred from the first log)')
+    merge.add_argument('-f', '--format', choices=list(SAVE_FORMATS.values()), default='txt',
+                       help='Output format of the batch, for counting the manifest items not done yet')
     args = parser.parse_args()
     
+    # Pipe modunda stdout yalnızca çıktıya ayrılır; durum mesajları stderr'e gider
+    out = sys.stdout.buffer
+    if args.pipe or args.raw:
+        sys.stdout = sys.stderr
+    converter = UltimateASCIIArtConverter()
+    for name, value, options in [('--color-mode', args.color_mode, converter.color_modes),
+                                 ('--char-set', args.char_set, converter.char_sets),
+                                 ('--palette', args.palette, converter.palettes)]:
+        if value is not None and value not in options:
+            parser.error(f"{name} must be one of: {', '.join(options)}")
+    if not 1 <= args.color_step <= 255:
+        parser.error("--color-step must be between 1 and 255")
+    if args.color_mode:
+        converter.current_color_mode = args.color_mode
+    if args.char_set:
+        converter.current_char_set = args.char_set
+    if args.palette:
+        converter.palette = args.palette
+    if args.width:
+        converter.output_width = args.width
+    converter.color_step = args.color_step
+    converter.colormap = args.colormap
+    converter.dither = args.dither
+    converter.shape_match = args.shape_match
+    converter.glyph_font = args.glyph_font
+    converter.calibrate = not args.no_calibrate
+    converter.target_fps = args.fps
+    converter.workers = max(1, args.workers)
+    converter.pipeline_mode = args.pipeline
+    converter.edge_backend = args.edge_backend
+    converter.edge_glyphs = args.edge_glyphs
+    converter.source.max_pixels = args.max_pixels
+    if args.cache or args.cache_cells or args.command == 'cache':
+        converter.art_cache = ArtCache(max_bytes=args.cache_size * 1024 ** 2, store_cells=args.cache_cells)
+    
+    if args.command == 'cache':
+        if args.clear:
+            converter.art_cache.clear()
+        entries, size = converter.art_cache.usage()
+        print(f"{converter.art_cache.root}: {entries} entries, {size / 1024 ** 2:.1f} MB "
+              f"(limit {args.cache_size} MB)")
+        sys.exit(0)
+    
+    if args.command == 'batch' and not (args.inputs or args.manifest):
+        parser.error("batch needs input files or --manifest")
+    if args.command == 'serve':
+        converter.run_server(args.host, args.port, args.queue_size, args.max_body)
+        sys.exit(0)
+    if args.command == 'watch':
+        if not os.path.isdir(args.folder):
+            parser.error(f"not a directory: {args.folder}")
+        sys.exit(1 if converter.run_watch(args.folder, args.format, args.output_dir, args.interval,
+                                          args.settle, args.idle_timeout) else 0)
+    if args.command in ('batch', 'merge'):
+        try:
+            if args.command == 'merge':
+                sys.exit(converter.run_merge(args.logs, args.manifest, args.failed,
+                                             args.output_dir, args.format))
+            if args.manifest:
+                jobs = converter.manifest_jobs(args.manifest, args.shard, args.output_dir, args.format)
+                log_path = converter.checkpoint_path(args.manifest, args.shard, args.output_dir)
+                with CheckpointLog(log_path) as log:
+                    failed = converter.run_batch(jobs, args.format, log)
+            else:
+                jobs = converter.batch_jobs(args.inputs, args.output_dir, args.format)
+                failed = converter.run_batch(jobs, args.format)
+        except (OSError, ValueError) as e:
+            print(colored(f"Error: {e}", 'red'), file=sys.stderr)
+            sys.exit(1)
+        sys.exit(1 if failed else 0)
+    
+    if args.pipe or args.raw:
+        converter.image_path = args.image or '-'
+        try:
+            converter.run_pipe(sys.stdin.buffer, out, args.raw)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            print(colored(f"Error: {e}", 'red'), file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+    
     if args.image:
         converter.image_path = args.image
-        if args.width:
-            converter.output_width = args.width
+        if args.export:
+            converter.export_animation(args.export)
+            sys.exit(0)
         converter.convert_image()
     
+    if keyboard is None:
+        parser.error("the interactive mode needs the 'keyboard' package; use --pipe otherwise")
     converter.run()
@@ -1,12 +1,18 @@
-import os
 import sys
 import numpy as np
-from PIL import Image, ImageEnhance, ImageOps, ImageFilter
+from PIL import Image, ImageEnhance, ImageFilter
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QLabel, QPushButton, QSlider, QComboBox, QFileDialog, 
                             QTextEdit, QSpinBox, QGroupBox, QCheckBox, QTabWidget)
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPixmap, QImage, QFont, QTextCursor, QPalette, QColor
+from ascii_engine import (render_chars, render_colored, grid_size, prescale,
+                          SourceImage, MAX_IMAGE_PIXELS, COLOR_MATRICES,
+                          apply_color_matrix, apply_point_ops, EDGE_BACKENDS, find_edges,
+                          direction_glyphs, CellGrid, COLORMAP_STOPS, render_heatmap,
+                          DITHER_MODES, subpixel_grid, render_subpixels,
+                          colormap_table, heatmap_levels, render_text_image, subpixel_mode,
+                          glyph_tile, oversample, decode_width, active_chars, cell_gray)
 
 class ASCIIArtConverterGUI(QMainWindow):
     def __init__(self):
@@ -16,16 +22,37 @@ class ASCIIArtConverterGUI(QMainWindow):
         
         # Main variables
         self.image_path = ""
+        self.source = SourceImage()
         self.original_image = None
         self.processed_image = None
+        self.processed_key = None
+        self.cells = None
+        self.cells_key = None
+        self.grid = None
+        self.pipeline_scale = 1.0
         self.ascii_art = ""
+        self.ascii_html = None
         self.char_sets = {
             'Basic': " .,:;+*?%S#@",
             'Extended': " `.-':_,^=;><+!rc*/z?sLTv)J7(|Fi{C}fI31tlu[neoZ5Yxjya]2ESwqkP6h9d4VpOGbUAKXHm8RD#$Bg0MNWQ%&@",
             'Blocks': " ░▒▓█",
             'Inverted': "@#S%?*+;:,. ",
+            'Braille': "⠀⠁⠃⠇⡇⣇⣧⣷⣿",
+            'Half Block': " ▀▄█",
             'Custom': ""
         }
+        self.subpixel_modes = {
+            'Braille': 'braille',
+            'Half Block': 'halfblock'
+        }
+        self.palettes = {
+            'Default': 'default',
+            'Vivid': 'vivid',
+            'Grayscale': 'grayscale',
+            'Retro': 'retro',
+            'ANSI 16': 'ansi16',
+            'xterm 256': 'xterm256'
+        }
         self.color_modes = {
             'None': self.convert_to_grayscale_ascii,
             'Grayscale': self.convert_to_grayscale_ascii,
@@ -34,6 +61,9 @@ class ASCIIArtConverterGUI(QMainWindow):
             'Blur': self.convert_blur_ascii,
             'Inverted': self.convert_inverted_ascii,
             'Sepia': self.convert_sepia_ascii,
+            'Warm': lambda img: self.convert_tone_ascii(img, 'warm'),
+            'Cool': lambda img: self.convert_tone_ascii(img, 'cool'),
+            'Duotone': lambda img: self.convert_tone_ascii(img, 'duotone'),
             'Heatmap': self.convert_heatmap_ascii
         }
         
@@ -47,8 +77,16 @@ class ASCIIArtConverterGUI(QMainWindow):
             'brightness': 1.0,
             'sharpness': 1.0,
             'edge_intensity': 1.0,
+            'edge_backend': 'cv2',
+            'edge_glyphs': False,
             'blur_radius': 0,
             'palette': 'Default',
+            'colormap': 'inferno',
+            'dither': 'none',
+            'shape_match': False,
+            'calibrate': True,
+            'pipeline': 'Fast',
+            'max_pixels': MAX_IMAGE_PIXELS,
             'font_size': 10,
             'live_preview': True
         }
@@ -130,12 +168,54 @@ class ASCIIArtConverterGUI(QMainWindow):
         palette_layout = QHBoxLayout()
         palette_layout.addWidget(QLabel("Palette:"))
         self.combo_palette = QComboBox()
-        self.combo_palette.addItems(['Default', 'Vivid', 'Grayscale', 'Retro'])
+        self.combo_palette.addItems(self.palettes.keys())
         self.combo_palette.setCurrentText(self.settings['palette'])
         self.combo_palette.currentTextChanged.connect(self.update_palette)
         palette_layout.addWidget(self.combo_palette)
         conv_layout.addLayout(palette_layout)
         
+        # Heatmap colormap
+        colormap_layout = QHBoxLayout()
+        colormap_layout.addWidget(QLabel("Colormap:"))
+        self.combo_colormap = QComboBox()
+        self.combo_colormap.addItems(COLORMAP_STOPS.keys())
+        self.combo_colormap.setCurrentText(self.settings['colormap'])
+        self.combo_colormap.currentTextChanged.connect(self.update_colormap)
+        colormap_layout.addWidget(self.combo_colormap)
+        conv_layout.addLayout(colormap_layout)
+        
+        # Ordered dithering
+        dither_layout = QHBoxLayout()
+        dither_layout.addWidget(QLabel("Dither:"))
+        self.combo_dither = QComboBox()
+        self.combo_dither.addItems(DITHER_MODES)
+        self.combo_dither.setCurrentText(self.settings['dither'])
+        self.combo_dither.currentTextChanged.connect(self.update_dither)
+        dither_layout.addWidget(self.combo_dither)
+        conv_layout.addLayout(dither_layout)
+        
+        # Shape matching
+        self.check_shape_match = QCheckBox("Match Glyph Shapes")
+        self.check_shape_match.setChecked(self.settings['shape_match'])
+        self.check_shape_match.stateChanged.connect(self.update_shape_match)
+        conv_layout.addWidget(self.check_shape_match)
+        
+        # Density calibration
+        self.check_calibrate = QCheckBox("Calibrate Glyph Density")
+        self.check_calibrate.setChecked(self.settings['calibrate'])
+        self.check_calibrate.stateChanged.connect(self.update_calibrate)
+        conv_layout.addWidget(self.check_calibrate)
+        
+        # Pipeline mode
+        pipeline_layout = QHBoxLayout()
+        pipeline_layout.addWidget(QLabel("Pipeline:"))
+        self.combo_pipeline = QComboBox()
+        self.combo_pipeline.addItems(['Fast', 'Quality'])
+        self.combo_pipeline.setCurrentText(self.settings['pipeline'])
+        self.combo_pipeline.currentTextChanged.connect(self.update_pipeline)
+        pipeline_layout.addWidget(self.combo_pipeline)
+        conv_layout.addLayout(pipeline_layout)
+        
         conv_group.setLayout(conv_layout)
         control_layout.addWidget(conv_group)
         
@@ -183,6 +263,21 @@ class ASCIIArtConverterGUI(QMainWindow):
         edge_layout.addWidget(self.slider_edge)
         adj_layout.addLayout(edge_layout)
         
+        # Edge backend
+        edge_backend_layout = QHBoxLayout()
+        edge_backend_layout.addWidget(QLabel("Edge Backend:"))
+        self.combo_edge_backend = QComboBox()
+        self.combo_edge_backend.addItems(EDGE_BACKENDS)
+        self.combo_edge_backend.setCurrentText(self.settings['edge_backend'])
+        self.combo_edge_backend.currentTextChanged.connect(self.update_edge_backend)
+        edge_backend_layout.addWidget(self.combo_edge_backend)
+        adj_layout.addLayout(edge_backend_layout)
+        
+        self.check_edge_glyphs = QCheckBox("Directional Edge Glyphs")
+        self.check_edge_glyphs.setChecked(self.settings['edge_glyphs'])
+        self.check_edge_glyphs.stateChanged.connect(self.update_edge_glyphs)
+        adj_layout.addWidget(self.check_edge_glyphs)
+        
         # Blur
         blur_layout = QHBoxLayout()
         blur_layout.addWidget(QLabel("Blur Radius:"))
@@ -261,8 +356,12 @@ class ASCIIArtConverterGUI(QMainWindow):
         has_image = self.original_image is not None
         controls = [
             self.spin_width, self.slider_zoom, self.combo_chars,
-            self.combo_color, self.combo_palette, self.slider_contrast,
+            self.combo_color, self.combo_palette, self.combo_colormap, self.combo_dither, self.check_shape_match,
+            self.check_calibrate,
+            self.combo_pipeline,
+            self.slider_contrast,
             self.slider_brightness, self.slider_sharpness, self.slider_edge,
+            self.combo_edge_backend, self.check_edge_glyphs,
             self.slider_blur, self.btn_copy, self.btn_save, self.btn_save_img,
             self.check_preview
         ]
@@ -279,7 +378,8 @@ class ASCIIArtConverterGUI(QMainWindow):
         if file_path:
             self.image_path = file_path
             try:
-                self.original_image = Image.open(file_path)
+                self.source.max_pixels = self.settings['max_pixels']
+                self.original_image = self.source.get(file_path, decode_width(self.conversion_settings()))
                 self.update_preview_image()
                 self.convert_image()
                 self.update_controls_state()
@@ -306,14 +406,13 @@ class ASCIIArtConverterGUI(QMainWindow):
     
     def apply_image_adjustments(self, img):
         # Apply all current adjustments to the image
-        if self.settings['contrast'] != 1.0:
-            img = ImageEnhance.Contrast(img).enhance(self.settings['contrast'])
-        if self.settings['brightness'] != 1.0:
-            img = ImageEnhance.Brightness(img).enhance(self.settings['brightness'])
+        # (contrast, brightness and invert are fused into one lookup table pass)
+        img = apply_point_ops(img, self.settings['contrast'], self.settings['brightness'],
+                              invert=self.settings['color_mode'] == 'Inverted')
         if self.settings['sharpness'] != 1.0:
             img = ImageEnhance.Sharpness(img).enhance(self.settings['sharpness'])
         if self.settings['blur_radius'] > 0:
-            img = img.filter(ImageFilter.GaussianBlur(self.settings['blur_radius']))
+            img = img.filter(ImageFilter.GaussianBlur(self.settings['blur_radius'] * self.pipeline_scale))
         
         return img
     
@@ -325,11 +424,32 @@ class ASCIIArtConverterGUI(QMainWindow):
             # Get the appropriate conversion function based on color mode
             converter = self.color_modes[self.settings['color_mode']]
             
-            # Process the image
-            self.processed_image = self.original_image.copy()
-            self.processed_image = self.apply_image_adjustments(self.processed_image)
+            # Decode again only if the new settings need more source pixels
+            settings = self.conversion_settings()
+            self.original_image = self.source.get(self.image_path, decode_width(settings))
+            
+            # Process the image (Fast mode shrinks it to a small multiple of the grid first).
+            # Adjustments only re-run when a setting that changes the pixels did.
+            self.grid = grid_size(self.original_image.size, self.settings['output_width'], self.settings['zoom'])
+            if subpixel_mode(settings):
+                self.grid = subpixel_grid(self.grid, subpixel_mode(settings))
+            processed_key = (self.image_path, self.source.version, self.grid, oversample(settings),
+                             self.settings['pipeline'],
+                             self.settings['contrast'], self.settings['brightness'],
+                             self.settings['sharpness'], self.settings['blur_radius'],
+                             self.settings['color_mode'] == 'Inverted')
+            if processed_key != self.processed_key:
+                self.pipeline_scale = 1.0
+                if self.settings['pipeline'] == 'Fast':
+                    self.processed_image, self.pipeline_scale = prescale(self.original_image, self.grid,
+                                                                         oversample(settings))
+                else:
+                    self.processed_image = self.original_image.copy()
+                self.processed_image = self.apply_image_adjustments(self.processed_image)
+                self.processed_key = processed_key
             
             # Convert to ASCII
+            self.ascii_html = None
             self.ascii_art = converter(self.processed_image)
             
             # Update preview
@@ -338,97 +458,114 @@ class ASCIIArtConverterGUI(QMainWindow):
         except Exception as e:
             self.show_error(f"Conversion error: {str(e)}")
     
+    def conversion_settings(self):
+        # Current settings in the mapping the shared ascii_engine helpers read
+        char_set = self.settings['char_set']
+        return {'width': self.settings['output_width'], 'zoom': self.settings['zoom'],
+                'pipeline': self.settings['pipeline'].lower(),
+                'char_set': self.subpixel_modes.get(char_set, char_set),
+                'chars': self.char_sets[char_set] or self.char_sets['Basic'],
+                'calibrate': self.settings['calibrate'], 'shape_match': self.settings['shape_match'],
+                'dither': self.settings['dither'], 'glyph_font': None}
+    
+    def image_cells(self, img, effect_key=None, effect=None):
+        # Per-cell statistics of the processed image (after an optional
+        # mode-specific effect), reused until the pixels would change
+        tile = glyph_tile(self.conversion_settings())
+        key = (self.processed_key, effect_key, tile)
+        if key != self.cells_key:
+            if effect is not None:
+                img = effect(img)
+            self.cells = CellGrid(img, self.grid, tile)
+            self.cells_key = key
+        return self.cells
+    
+    def render_gray(self, cells, overlay=None, normalize=False):
+        settings = self.conversion_settings()
+        if subpixel_mode(settings):
+            return render_subpixels(cells.gray(normalize), subpixel_mode(settings), self.settings['dither'])
+        chars = active_chars(settings)
+        return render_chars(cell_gray(cells, chars, settings, normalize), chars, overlay)
+    
+    def render_color(self, cells):
+        settings = self.conversion_settings()
+        chars = active_chars(settings)
+        palette = self.palettes[self.settings['palette']]
+        if subpixel_mode(settings):
+            return self.render_subpixels(cells, cells.colors(), palette)
+        gray = cell_gray(cells, chars, settings)
+        
+        # The preview shows the palette as rich text
+        self.ascii_html = render_colored(cells.colors(), chars, palette, gray=gray, as_html=True)
+        
+        if palette == 'vivid':
+            return render_colored(cells.colors(), chars, palette, gray=gray)
+        
+        # Plain text for clipboard and saving
+        return render_chars(gray, chars)
+    
+    def render_subpixels(self, cells, rgb, palette, plain=False):
+        # Rich text preview; clipboard text keeps ANSI colors only for Vivid
+        mode, dither_mode = subpixel_mode(self.conversion_settings()), self.settings['dither']
+        gray = cells.gray()
+        self.ascii_html = render_subpixels(gray, mode, dither_mode, rgb, palette, as_html=True)
+        if palette == 'vivid' and not plain:
+            return render_subpixels(gray, mode, dither_mode, rgb, palette)
+        return render_subpixels(gray, mode, dither_mode)
+    
     def convert_to_grayscale_ascii(self, img):
-        # Prepare image
-        img = img.convert('L')  # Convert to grayscale
-        width, height = img.size
-        aspect_ratio = height / width
-        new_width = int(self.settings['output_width'] * self.settings['zoom'])
-        new_height = int(new_width * aspect_ratio * 0.55)  # 0.55 to account for character aspect ratio
-        
-        img = img.resize((new_width, new_height))
-        pixels = np.array(img)
-        
-        # Get character set
-        chars = self.char_sets[self.settings['char_set']] or self.char_sets['Basic']
-        char_len = len(chars)
-        
-        # Convert to ASCII
-        ascii_chars = []
-        for row in pixels:
-            line = [chars[min(int(pixel * (char_len - 1) / 255), char_len-1)] for pixel in row]
-            ascii_chars.append("".join(line))
-        
-        return "\n".join(ascii_chars)
+        return self.render_gray(self.image_cells(img))
     
     def convert_to_colored_ascii(self, img):
-        img = img.convert('RGB')
-        width, height = img.size
-        aspect_ratio = height / width
-        new_width = int(self.settings['output_width'] * self.settings['zoom'])
-        new_height = int(new_width * aspect_ratio * 0.55)
-        
-        img = img.resize((new_width, new_height))
-        pixels = np.array(img)
-        
-        chars = self.char_sets[self.settings['char_set']] or self.char_sets['Basic']
-        char_len = len(chars)
-        
-        ascii_chars = []
-        for row in pixels:
-            line = []
-            for pixel in row:
-                r, g, b = pixel
-                gray = int(0.2989 * r + 0.5870 * g + 0.1140 * b)
-                char = chars[min(int(gray * (char_len - 1) / 255), char_len-1)]
-                
-                if self.settings['palette'] == 'Vivid':
-                    line.append(f"\033[38;2;{r};{g};{b}m{char}\033[0m")
-                else:
-                    # Simplified colored output for GUI
-                    line.append(char)
-            
-            ascii_chars.append("".join(line))
-        
-        return "\n".join(ascii_chars)
+        return self.render_color(self.image_cells(img))
     
     def convert_edge_ascii(self, img):
-        img = img.convert('L')
-        img_np = np.array(img)
-        edges = feature.canny(img_np/255., sigma=self.settings['edge_intensity'])
-        edge_img = Image.fromarray((edges * 255).astype(np.uint8))
-        return self.convert_to_grayscale_ascii(edge_img)
+        effect_key = ('edge', self.settings['edge_intensity'], self.settings['edge_backend'])
+        cells = self.image_cells(img, effect_key, self.edge_image)
+        overlay = None
+        if self.settings['edge_glyphs'] and not subpixel_mode(self.conversion_settings()):
+            overlay = direction_glyphs(cells)
+        return self.render_gray(cells, overlay, normalize=True)
+    
+    def edge_image(self, img):
+        gray = np.array(img.convert('L'))
+        sigma = self.settings['edge_intensity'] * self.pipeline_scale
+        return Image.fromarray(find_edges(gray, sigma, self.settings['edge_backend']))
     
     def convert_blur_ascii(self, img):
+        cells = self.image_cells(img, ('blur', self.settings['blur_radius']), self.blur_image)
+        return self.render_gray(cells)
+    
+    def blur_image(self, img):
         img = img.convert('L')
         if self.settings['blur_radius'] > 0:
-            img = img.filter(ImageFilter.GaussianBlur(self.settings['blur_radius']))
-        return self.convert_to_grayscale_ascii(img)
+            img = img.filter(ImageFilter.GaussianBlur(self.settings['blur_radius'] * self.pipeline_scale))
+        return img
     
     def convert_inverted_ascii(self, img):
-        img = img.convert('L')
-        img = ImageOps.invert(img)
+        # Inversion already happened in apply_image_adjustments
         return self.convert_to_grayscale_ascii(img)
     
     def convert_sepia_ascii(self, img):
-        img = img.convert('RGB')
-        width, height = img.size
-        pixels = img.load()
-        
-        for py in range(height):
-            for px in range(width):
-                r, g, b = pixels[px, py]
-                tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-                tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-                tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-                pixels[px, py] = (min(255, tr), min(255, tg), min(255, tb))
-        
-        return self.convert_to_colored_ascii(img)
+        return self.convert_tone_ascii(img, 'sepia')
+    
+    def convert_tone_ascii(self, img, tone):
+        cells = self.image_cells(img, ('tone', tone),
+                                 lambda img: apply_color_matrix(img, COLOR_MATRICES[tone]))
+        return self.render_color(cells)
     
     def convert_heatmap_ascii(self, img):
-        # This is a simplified version for GUI
-        img = img.convert('L')
-        return self.convert_to_grayscale_ascii(img)
+        cells = self.image_cells(img)
+        settings = self.conversion_settings()
+        if subpixel_mode(settings):
+            table = colormap_table(self.settings['colormap'])
+            return self.render_subpixels(cells, table[heatmap_levels(cells.gray())], 'vivid',
+                                         plain=True)
+        chars = active_chars(settings)
+        gray = cell_gray(cells, chars, settings)
+        self.ascii_html = render_heatmap(cells.gray(), chars, self.settings['colormap'],
+                                         as_html=True, glyphs=gray)
+        return render_chars(gray, chars)
     
     def update_ascii_preview(self):
         if not self.ascii_art:
@@ -437,9 +574,9 @@ class ASCIIArtConverterGUI(QMainWindow):
         self.ascii_preview.clear()
         cursor = self.ascii_preview.textCursor()
         
-        if self.settings['color_mode'] == 'Colored' and self.settings['palette'] == 'Vivid':
-            # For colored text, we need to handle ANSI codes
-            self.ascii_preview.setText(self.ascii_art)
+        if self.ascii_html:
+            # Colored modes render the palette as HTML spans
+            self.ascii_preview.setHtml(f"<pre>{self.ascii_html}</pre>")
         else:
             # For monochrome, just set the text
             self.ascii_preview.setPlainText(self.ascii_art)
@@ -495,15 +632,33 @@ class ASCIIArtConverterGUI(QMainWindow):
         blur_enabled = value == 'Blur'
         
         self.slider_edge.setEnabled(edge_enabled)
+        self.combo_edge_backend.setEnabled(edge_enabled)
+        self.check_edge_glyphs.setEnabled(edge_enabled)
         self.slider_blur.setEnabled(blur_enabled)
-        self.combo_palette.setEnabled(value == 'Colored')
+        self.combo_palette.setEnabled(value in ['Colored', 'Sepia', 'Warm', 'Cool', 'Duotone'])
+        self.combo_colormap.setEnabled(value == 'Heatmap')
         
         if self.settings['live_preview']:
             self.convert_image()
     
     def update_palette(self, value):
         self.settings['palette'] = value
-        if self.settings['live_preview'] and self.settings['color_mode'] == 'Colored':
+        if self.settings['live_preview'] and self.combo_palette.isEnabled():
+            self.convert_image()
+    
+    def update_pipeline(self, value):
+        self.settings['pipeline'] = value
+        if self.settings['live_preview']:
+            self.convert_image()
+    
+    def update_colormap(self, value):
+        self.settings['colormap'] = value
+        if self.settings['live_preview'] and self.settings['color_mode'] == 'Heatmap':
+            self.convert_image()
+    
+    def update_dither(self, value):
+        self.settings['dither'] = value
+        if self.settings['live_preview']:
             self.convert_image()
     
     def update_contrast(self, value):
@@ -526,6 +681,26 @@ class ASCIIArtConverterGUI(QMainWindow):
         if self.settings['live_preview']:
             self.convert_image()
     
+    def update_edge_backend(self, value):
+        self.settings['edge_backend'] = value
+        if self.settings['live_preview']:
+            self.convert_image()
+    
+    def update_edge_glyphs(self, state):
+        self.settings['edge_glyphs'] = state == Qt.Checked
+        if self.settings['live_preview']:
+            self.convert_image()
+    
+    def update_shape_match(self, state):
+        self.settings['shape_match'] = state == Qt.Checked
+        if self.settings['live_preview']:
+            self.convert_image()
+    
+    def update_calibrate(self, state):
+        self.settings['calibrate'] = state == Qt.Checked
+        if self.settings['live_preview']:
+            self.convert_image()
+    
     def update_blur(self, value):
         self.settings['blur_radius'] = value
         if self.settings['live_preview']:
@@ -569,17 +744,8 @@ class ASCIIArtConverterGUI(QMainWindow):
         
         if file_path:
             try:
-                # Create an image with the ASCII art
-                font_size = 10
-                lines = self.ascii_art.split('\n')
-                img_width = max(len(line) for line in lines) * font_size // 2
-                img_height = len(lines) * font_size
-                
-                # Create a black image
-                img = Image.new('RGB', (img_width, img_height), color='black')
-                
-                # Draw text (simplified - for a complete solution consider using PIL.ImageDraw)
-                # This is a placeholder - actual implementation would need more work
+                # Drawn in the font the density calibration measured
+                img = render_text_image(self.ascii_art, font_size=self.settings['font_size'])
                 img.save(file_path)
                 
                 self.show_message(f"Image saved to {file_path}")
@@ -0,0 +1,2038 @@
+import os
+import re
+import sys
+import time
+import signal
+import queue
+import threading
+import html
+import json
+import hashlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageStat
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+try:
+    from skimage import feature
+except ImportError:
+    feature = None
+
+# Shared conversion engine used by both the CLI and the GUI.
+
+CACHE_DIR = os.environ.get('ASCII_ART_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'ultimate-ascii-art'))
+
+
+def save_cached_array(name, array):
+    # Best effort: write to a temp file and rename so readers never see a
+    # partial file; a read-only cache dir just means rebuilding next time
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = os.path.join(CACHE_DIR, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def load_cached_array(name):
+    try:
+        return np.load(os.path.join(CACHE_DIR, name))
+    except (OSError, ValueError):
+        return None
+
+
+# -------------------- Character Mapping --------------------
+_char_lut_cache = {}
+
+
+def char_lut(chars):
+    # 256-entry pixel -> codepoint table, built with the same arithmetic the
+    # old per-pixel comprehension used so the output stays identical.
+    lut = _char_lut_cache.get(chars)
+    if lut is None:
+        char_len = len(chars)
+        codes = [ord(chars[min(int(value * (char_len - 1) / 255), char_len - 1)])
+                 for value in range(256)]
+        dtype = np.uint8 if max(codes) < 256 else np.dtype('<u4')
+        lut = np.array(codes, dtype=dtype)
+        _char_lut_cache[chars] = lut
+    return lut
+
+
+def grid_to_text(codes):
+    # Codepoint grid -> text with one buffer decode instead of per-row joins
+    height, width = codes.shape
+    buf = np.empty((height, width + 1), dtype=codes.dtype)
+    buf[:, :width] = codes
+    buf[:, width] = ord('\n')
+    encoding = 'latin-1' if codes.dtype == np.uint8 else 'utf-32-le'
+    return buf.tobytes().decode(encoding)[:-1]
+
+
+def render_chars(pixels, chars, overlay=None):
+    # overlay: optional codepoint grid whose non-zero cells replace the mapped glyph
+    codes = char_lut(chars)[pixels]
+    if overlay is not None:
+        codes = np.where(overlay > 0, overlay.astype(codes.dtype), codes)
+    return grid_to_text(codes)
+
+
+# -------------------- Colored Rendering --------------------
+ANSI_RESET = "\033[0m"
+ANSI_ESCAPE = re.compile(r"\033\[[0-9;]*m")
+
+
+def luminance(rgb):
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    return (0.2989 * r + 0.5870 * g + 0.1140 * b).astype(np.uint8)
+
+
+def quantize_colors(rgb, step):
+    # Snap colors to the centre of `step`-wide buckets so neighbouring cells
+    # with nearly the same color share one escape sequence
+    if step <= 1:
+        return rgb
+    rgb = rgb.astype(np.int16)  # uint8 would wrap before the clip
+    return np.minimum(rgb // step * step + step // 2, 255).astype(np.uint8)
+
+
+def truecolor_keys(rgb):
+    rgb = rgb.astype(np.int64)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def truecolor_sgr(key):
+    return f"38;2;{key >> 16};{(key >> 8) & 255};{key & 255}"
+
+
+def background_sgr(sgr):
+    # Foreground SGR parameters -> the matching background ones
+    if sgr.startswith('38;'):
+        return '48' + sgr[2:]
+    return str(int(sgr) + 10)
+
+
+def color_keys(rgb, palette='vivid', color_step=1):
+    # Per-cell color keys, plus key -> SGR parameters and key -> CSS color
+    if palette == 'vivid':
+        keys = truecolor_keys(quantize_colors(rgb, color_step))
+        return keys, truecolor_sgr, lambda key: f"#{key:06x}"
+    hex_colors = [f"#{r:02x}{g:02x}{b:02x}" for r, g, b in PALETTES[palette]['colors']]
+    return quantize_palette(rgb, palette), PALETTES[palette]['codes'].__getitem__, hex_colors.__getitem__
+
+
+def color_runs(codes, keys):
+    # Splits every row into runs of equal color key. Rows are followed by a
+    # newline run with key -1. Returns the text and (key, start, end) runs.
+    height, width = codes.shape
+    text = grid_to_text(codes) + '\n'
+    flat = np.empty((height, width + 1), dtype=np.int64)
+    flat[:, :width] = keys
+    flat[:, width] = -1
+    flat = flat.ravel()
+    starts = np.flatnonzero(np.concatenate(([True], flat[1:] != flat[:-1])))
+    ends = np.append(starts[1:], flat.size)
+    return text, zip(flat[starts].tolist(), starts.tolist(), ends.tolist())
+
+
+def render_runs(codes, keys, escape):
+    # Emit an escape only where the color key changes along a row, and a
+    # single reset at the end of every line
+    if not codes.size:
+        return grid_to_text(codes)
+    text, runs = color_runs(codes, keys)
+    table = {-1: ANSI_RESET}
+    pieces = []
+    for key, start, end in runs:
+        prefix = table.get(key)
+        if prefix is None:
+            prefix = table[key] = escape(key)
+        pieces.append(prefix + text[start:end])
+    return "".join(pieces)[:-1]
+
+
+def render_html_runs(codes, keys, style):
+    # Same run coalescing as render_runs, as <span> elements for rich text
+    # views; style(key) returns the span's CSS declarations
+    if not codes.size:
+        return ""
+    text, runs = color_runs(codes, keys)
+    pieces = []
+    for key, start, end in runs:
+        if key < 0:
+            pieces.append(text[start:end])
+        else:
+            pieces.append(f'<span style="{style(key)}">{html.escape(text[start:end])}</span>')
+    return "".join(pieces)[:-1]
+
+
+def render_colored(rgb, chars, palette='vivid', color_step=1, gray=None, as_html=False):
+    # rgb: HxWx3 uint8 grid. 'vivid' gives every cell its own (optionally
+    # quantized) truecolor; other palettes go through their quantization LUT.
+    if gray is None:
+        gray = luminance(rgb)
+    codes = char_lut(chars)[gray]
+    keys, sgr, css = color_keys(rgb, palette, color_step)
+    if as_html:
+        return render_html_runs(codes, keys, lambda key: f"color:{css(key)}")
+    return render_runs(codes, keys, lambda key: f"\033[{sgr(key)}m")
+
+
+# -------------------- Palettes --------------------
+# Each palette is a precomputed 32x32x32 RGB -> entry index table, so
+# quantizing a frame is a single gather. Tables are cached on disk.
+PALETTE_BITS = 5
+ANSI16_COLORS = [(0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+                 (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+                 (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+                 (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255)]
+ANSI16_CODES = [str(code) for code in list(range(30, 38)) + list(range(90, 98))]
+XTERM_LEVELS = (0, 95, 135, 175, 215, 255)
+
+
+def xterm_color(code):
+    if code >= 232:
+        level = 8 + 10 * (code - 232)
+        return (level, level, level)
+    code -= 16
+    return (XTERM_LEVELS[code // 36], XTERM_LEVELS[code // 6 % 6], XTERM_LEVELS[code % 6])
+
+
+def xterm_palette(codes, match):
+    return {'codes': [f"38;5;{code}" for code in codes],
+            'colors': [xterm_color(code) for code in codes],
+            'match': match}
+
+
+# match: 'nearest' RGB distance, 'ramp' maps luminance evenly across the
+# entries (dark to light), 'average' reproduces the original 4-color
+# classification by (r+g+b)/3 thresholds
+PALETTES = {
+    'default': {'codes': ['30', '34', '32', '97'],
+                'colors': [ANSI16_COLORS[i] for i in (0, 4, 2, 15)],
+                'match': 'average'},
+    'grayscale': xterm_palette([16] + list(range(232, 256)) + [231], 'ramp'),
+    'retro': xterm_palette([16, 22, 28, 34, 40, 46, 83, 120, 157, 194], 'ramp'),
+    'ansi16': {'codes': ANSI16_CODES, 'colors': ANSI16_COLORS, 'match': 'nearest'},
+    'xterm256': xterm_palette(range(16, 256), 'nearest'),
+}
+_palette_lut_cache = {}
+
+
+def build_palette_lut(spec):
+    levels = 1 << PALETTE_BITS
+    step = 256 // levels
+    centers = np.indices((levels,) * 3).reshape(3, -1).T.astype(np.float32) * step + step // 2
+    colors = np.array(spec['colors'], dtype=np.float32)
+    
+    if spec['match'] == 'average':
+        index = np.digitize(centers.sum(axis=1) / 3, [60, 120, 180])
+    elif spec['match'] == 'ramp':
+        lum = centers @ np.array([0.2989, 0.5870, 0.1140], dtype=np.float32)
+        index = np.rint(lum / 255 * (len(colors) - 1))
+    else:
+        # |c - p|^2 without materializing every difference vector
+        dist = (centers ** 2).sum(axis=1)[:, None] - 2 * centers @ colors.T + (colors ** 2).sum(axis=1)
+        index = dist.argmin(axis=1)
+    return index.astype(np.uint8).reshape((levels,) * 3)
+
+
+def palette_lut(name):
+    lut = _palette_lut_cache.get(name)
+    if lut is None:
+        spec = PALETTES[name]
+        digest = hashlib.sha1(repr((PALETTE_BITS, sorted(spec.items()))).encode()).hexdigest()[:12]
+        cache_name = f"palette-{name}-{digest}.npy"
+        lut = load_cached_array(cache_name)
+        if lut is None:
+            lut = build_palette_lut(spec)
+            save_cached_array(cache_name, lut)
+        _palette_lut_cache[name] = lut
+    return lut
+
+
+def quantize_palette(rgb, name):
+    shift = 8 - PALETTE_BITS
+    return palette_lut(name)[rgb[..., 0] >> shift, rgb[..., 1] >> shift, rgb[..., 2] >> shift]
+
+
+# -------------------- Heatmap --------------------
+# Colormaps as evenly spaced control points, expanded to 256-entry tables
+COLORMAP_STOPS = {
+    'inferno': [(0, 0, 4), (22, 11, 57), (66, 10, 104), (106, 23, 110), (147, 38, 103),
+                (188, 55, 84), (221, 81, 58), (243, 120, 25), (252, 165, 10),
+                (246, 215, 70), (252, 255, 164)],
+    'jet': [(0, 0, 128), (0, 0, 241), (0, 76, 255), (0, 176, 255), (41, 255, 206),
+            (125, 255, 122), (206, 255, 41), (255, 196, 0), (255, 104, 0),
+            (241, 8, 0), (128, 0, 0)],
+    'turbo': [(48, 18, 59), (69, 89, 203), (62, 155, 254), (25, 213, 205), (70, 248, 132),
+              (164, 252, 60), (225, 221, 55), (254, 164, 49), (240, 91, 18),
+              (195, 37, 3), (122, 4, 3)],
+}
+HEATMAP_LEVELS = 32
+_colormap_cache = {}
+
+
+def colormap_table(name):
+    table = _colormap_cache.get(name)
+    if table is None:
+        stops = np.array(COLORMAP_STOPS[name], dtype=np.float64)
+        positions = np.linspace(0, 255, len(stops))
+        values = np.arange(256)
+        table = np.stack([np.interp(values, positions, stops[:, c]) for c in range(3)], axis=-1)
+        table = np.rint(table).astype(np.uint8)
+        _colormap_cache[name] = table
+    return table
+
+
+def heatmap_levels(gray, levels=HEATMAP_LEVELS):
+    step = max(1, 256 // levels)
+    return np.minimum(gray.astype(np.int64) // step * step + step // 2, 255)
+
+
+def render_heatmap(gray, chars, colormap='inferno', levels=HEATMAP_LEVELS, as_html=False, glyphs=None):
+    # Color follows cell intensity; intensities are bucketed into `levels`
+    # so neighbouring cells share escape sequences. `glyphs` optionally picks
+    # characters from a different (e.g. dithered) intensity grid.
+    codes = char_lut(chars)[gray if glyphs is None else glyphs]
+    keys = heatmap_levels(gray, levels)
+    table = colormap_table(colormap)
+    if as_html:
+        return render_html_runs(codes, keys, lambda key: "color:#%02x%02x%02x" % tuple(table[key]))
+    return render_runs(codes, keys, lambda key: "\033[38;2;%d;%d;%dm" % tuple(table[key]))
+
+
+# -------------------- Dithering --------------------
+# Ordered dithering between the cell grid and character mapping: each cell
+# gets a threshold from a tiled matrix, so small char sets band less.
+DITHER_MODES = ('none', 'bayer2', 'bayer4', 'bayer8', 'bluenoise')
+BLUE_NOISE_SIZE = 64
+_dither_cache = {}
+
+
+def bayer_matrix(size):
+    m = np.zeros((1, 1), dtype=np.int64)
+    while m.shape[0] < size:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return m
+
+
+def blue_noise_matrix(size=BLUE_NOISE_SIZE, sigma=1.5, seed=0):
+    # Void-and-cluster: rank every pixel by repeatedly filling the largest
+    # void (lowest toroidal gaussian energy) of the current pattern
+    offsets = np.minimum(np.arange(size), size - np.arange(size))
+    kernel = np.exp(-(offsets[:, None] ** 2 + offsets[None, :] ** 2) / (2 * sigma ** 2))
+    
+    def energy_of(pattern):
+        return np.real(np.fft.ifft2(np.fft.fft2(pattern) * np.fft.fft2(kernel)))
+    
+    def toggle(pattern, energy, index, value):
+        y, x = divmod(index, size)
+        pattern[y, x] = value
+        energy += (1 if value else -1) * np.roll(kernel, (y, x), axis=(0, 1))
+    
+    # Initial pattern: random 10% of pixels, relaxed until no cluster moves
+    rng = np.random.default_rng(seed)
+    pattern = (rng.random((size, size)) < 0.1).astype(np.float64)
+    energy = energy_of(pattern)
+    while True:
+        cluster = np.where(pattern > 0, energy, -np.inf).argmax()
+        toggle(pattern, energy, cluster, 0)
+        void = np.where(pattern > 0, np.inf, energy).argmin()
+        toggle(pattern, energy, void, 1)
+        if void == cluster:
+            break
+    
+    ranks = np.zeros(size * size, dtype=np.int64)
+    ones = int(pattern.sum())
+    
+    # Ranks below the initial count: remove tightest clusters
+    work, work_energy = pattern.copy(), energy.copy()
+    for rank in range(ones - 1, -1, -1):
+        cluster = np.where(work > 0, work_energy, -np.inf).argmax()
+        toggle(work, work_energy, cluster, 0)
+        ranks[cluster] = rank
+    
+    # Remaining ranks: fill largest voids
+    for rank in range(ones, size * size):
+        void = np.where(pattern > 0, np.inf, energy).argmin()
+        toggle(pattern, energy, void, 1)
+        ranks[void] = rank
+    return ranks.reshape(size, size)
+
+
+def dither_thresholds(mode):
+    # k x k matrix of thresholds in (0, 1)
+    thresholds = _dither_cache.get(mode)
+    if thresholds is None:
+        if mode == 'bluenoise':
+            cache_name = f"bluenoise-{BLUE_NOISE_SIZE}.npy"
+            ranks = load_cached_array(cache_name)
+            if ranks is None:
+                ranks = blue_noise_matrix()
+                save_cached_array(cache_name, ranks)
+        else:
+            ranks = bayer_matrix(int(mode[len('bayer'):]))
+        thresholds = (ranks + 0.5) / ranks.size
+        _dither_cache[mode] = thresholds
+    return thresholds
+
+
+def tile_thresholds(shape, mode):
+    thresholds = dither_thresholds(mode)
+    k = thresholds.shape[0]
+    height, width = shape
+    return thresholds[np.arange(height)[:, None] % k, np.arange(width)[None, :] % k]
+
+
+def dither(gray, levels, mode='none'):
+    # gray: uint8 intensities mapped later onto the glyphs of a ramp; levels:
+    # the first intensity of every glyph (glyph_levels). Dithering happens
+    # in glyph-index space, so uneven (calibrated) ramps only ever mix a cell
+    # with the next glyph up, and flat black or white stays flat.
+    if mode == 'none' or len(levels) < 2:
+        return gray
+    starts = np.asarray(levels, dtype=np.float32)
+    spans = np.diff(starts, append=256.0)
+    index = np.searchsorted(starts, gray, side='right') - 1
+    position = index + (gray - starts[index]) / spans[index]
+    index = (position + tile_thresholds(gray.shape, mode)).astype(np.intp)
+    return np.asarray(levels, dtype=np.uint8)[np.minimum(index, len(levels) - 1)]
+
+
+def binarize(gray, mode='none'):
+    # On/off subpixels: a fixed midpoint, or the dither matrix as thresholds
+    if mode == 'none':
+        return gray >= 128
+    return gray > tile_thresholds(gray.shape, mode) * 255
+
+
+# -------------------- Subpixel Modes --------------------
+# Dense modes pack several thresholded samples into one character: Braille
+# holds a 2x4 dot matrix (U+2800-U+28FF), half blocks a top and a bottom
+# half. Each entry: (subpixels across, subpixels down), bit shift of every
+# subpixel, packed bits -> codepoint table.
+SUBPIXEL_MODES = {
+    'braille': ((2, 4), [[0, 3], [1, 4], [2, 5], [6, 7]],
+                np.arange(0x2800, 0x2900, dtype=np.uint32)),
+    'halfblock': ((1, 2), [[0], [1]],
+                  np.array([ord(c) for c in ' ▀▄█'], dtype=np.uint32)),
+}
+HALF_BLOCK = 0x2580
+
+
+def subpixel_grid(grid, mode):
+    # Sample grid behind a character grid; each subpixel is roughly square
+    (across, down), _, _ = SUBPIXEL_MODES[mode]
+    return grid[0] * across, grid[1] * down
+
+
+def pack_subpixels(mask, mode):
+    # Boolean subpixel grid -> codepoint grid, one shift-and-sum over all cells
+    (across, down), shifts, table = SUBPIXEL_MODES[mode]
+    height, width = mask.shape
+    bits = np.zeros((height // down, width // across), dtype=np.uint8)
+    for row, row_shifts in enumerate(shifts):
+        for col, shift in enumerate(row_shifts):
+            bits += mask[row::down, col::across].view(np.uint8) << np.uint8(shift)
+    return table[bits]
+
+
+def cell_average(rgb, mode):
+    # Mean color of the subpixels behind every character
+    (across, down), _, _ = SUBPIXEL_MODES[mode]
+    height, width = rgb.shape[:2]
+    blocks = rgb.reshape(height // down, down, width // across, across, 3)
+    return np.rint(blocks.mean(axis=(1, 3))).astype(np.uint8)
+
+
+def render_subpixels(gray, mode, dither_mode='none', rgb=None, palette='vivid', color_step=1, as_html=False):
+    # gray (and rgb) are subpixel grids from subpixel_grid(). Without rgb
+    # the glyphs alone carry the image; with rgb Braille dots take the
+    # cell's mean color, and half blocks become an upper half block with the
+    # top sample as foreground and the bottom one as background.
+    if rgb is None:
+        text = grid_to_text(pack_subpixels(binarize(gray, dither_mode), mode))
+        return html.escape(text) if as_html else text
+    
+    if mode == 'braille':
+        codes = pack_subpixels(binarize(gray, dither_mode), mode)
+        keys, sgr, css = color_keys(cell_average(rgb, mode), palette, color_step)
+        if as_html:
+            return render_html_runs(codes, keys, lambda key: f"color:{css(key)}")
+        return render_runs(codes, keys, lambda key: f"\033[{sgr(key)}m")
+    
+    top, sgr, css = color_keys(rgb[0::2], palette, color_step)
+    bottom, _, _ = color_keys(rgb[1::2], palette, color_step)
+    keys = (top.astype(np.int64) << 24) | bottom
+    codes = np.full(keys.shape, HALF_BLOCK, dtype=np.uint32)
+    if as_html:
+        return render_html_runs(codes, keys, lambda key: f"color:{css(key >> 24)};"
+                                                         f"background-color:{css(key & 0xFFFFFF)}")
+    return render_runs(codes, keys, lambda key: f"\033[{sgr(key >> 24)};"
+                                                f"{background_sgr(sgr(key & 0xFFFFFF))}m")
+
+
+# -------------------- Glyph Shapes --------------------
+# Shape matching compares each cell's tile of pixels with the rasterized
+# glyphs of the char set, so edges and diagonals pick glyphs of the same
+# shape instead of whichever has the right brightness.
+GLYPH_TILE = (8, 16)
+# Monospace fonts tried in order when no font is given
+# (Consolas, Menlo, Courier New, DejaVu Sans Mono)
+GLYPH_FONTS = ('consola.ttf', 'Menlo.ttc', 'cour.ttf', 'Courier New.ttf', 'DejaVuSansMono.ttf')
+GLYPH_RENDER_SIZE = 64
+_glyph_cache = {}
+
+
+def glyph_font(font_path=None, size=GLYPH_RENDER_SIZE):
+    # An explicit font must exist; otherwise the first installed monospace
+    # font wins, then Pillow's own scalable one (Pillow 10.1+)
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    for name in GLYPH_FONTS:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            pass
+    return ImageFont.load_default(size)
+
+
+def rasterize_glyphs(chars, font, tile=GLYPH_TILE):
+    # One row of ink coverage in [0, 1] per char, drawn into a full font
+    # cell at render size and box-filtered down to the tile
+    ascent, descent = font.getmetrics()
+    cell = (max(1, round(font.getlength('M'))), ascent + descent)
+    bitmaps = np.empty((len(chars), tile[0] * tile[1]), dtype=np.float32)
+    for i, char in enumerate(chars):
+        canvas = Image.new('L', cell)
+        ImageDraw.Draw(canvas).text((cell[0] / 2, 0), char, fill=255, font=font, anchor='ma')
+        bitmaps[i] = np.asarray(canvas.resize(tile, Image.BOX), dtype=np.float32).ravel() / 255
+    return bitmaps
+
+
+def glyph_bitmaps(chars, font_path=None, tile=GLYPH_TILE):
+    key = (font_path, chars, tile)
+    bitmaps = _glyph_cache.get(key)
+    if bitmaps is None:
+        font = glyph_font(font_path)
+        spec = (font.getname(), GLYPH_RENDER_SIZE, chars, tile)
+        cache_name = f"glyphs-{hashlib.sha1(repr(spec).encode()).hexdigest()[:12]}.npy"
+        bitmaps = load_cached_array(cache_name)
+        if bitmaps is None:
+            bitmaps = rasterize_glyphs(chars, font, tile)
+            save_cached_array(cache_name, bitmaps)
+        _glyph_cache[key] = bitmaps
+    return bitmaps
+
+
+def glyph_levels(chars):
+    # One representative intensity per distinct glyph char_lut can produce,
+    # and those glyphs in order
+    lut = char_lut(chars)
+    values = np.flatnonzero(np.concatenate(([True], lut[1:] != lut[:-1])))
+    return values.astype(np.uint8), ''.join(chr(code) for code in lut[values])
+
+
+def match_glyphs(tiles, glyphs):
+    # Nearest glyph for every tile with one matrix product over the grid:
+    # argmin |t - g|^2 = argmax t.g - |g|^2 / 2
+    scores = tiles @ glyphs.T
+    scores -= 0.5 * (glyphs ** 2).sum(axis=1)
+    return scores.argmax(axis=-1)
+
+
+def shape_levels(tiles, chars, font_path=None):
+    # Intensity grid whose char_lut lookup is the best-matching glyph, so it
+    # drops into any renderer in place of CellGrid.gray()
+    values, glyph_chars = glyph_levels(chars)
+    return values[match_glyphs(tiles, glyph_bitmaps(glyph_chars, font_path))]
+
+
+# -------------------- Density Calibration --------------------
+# Hand-ordered ramps are uneven in real ink coverage. Calibration measures
+# every glyph in the output font and re-spreads the set into a 256-glyph
+# ramp (one glyph per intensity) spaced evenly by coverage. Being a plain
+# string, the result works anywhere a char set does.
+_calibrated_cache = {}
+
+
+def calibrate_chars(chars, font_path=None):
+    key = (font_path, chars)
+    ramp = _calibrated_cache.get(key)
+    if ramp is None:
+        spec = (glyph_font(font_path).getname(), GLYPH_RENDER_SIZE, GLYPH_TILE, chars)
+        cache_name = f"density-{hashlib.sha1(repr(spec).encode()).hexdigest()[:12]}.npy"
+        codes = load_cached_array(cache_name)
+        if codes is None:
+            coverage = glyph_bitmaps(chars, font_path).mean(axis=1)
+            # Keep the set's direction: ' ..@' gets denser with intensity,
+            # inverted sets get lighter
+            targets = np.linspace(coverage.min(), coverage.max(), 256)
+            if coverage[0] > coverage[-1]:
+                targets = targets[::-1]
+            index = np.abs(coverage[None, :] - targets[:, None]).argmin(axis=1)
+            codes = np.array([ord(chars[i]) for i in index], dtype=np.uint32)
+            save_cached_array(cache_name, codes)
+        ramp = _calibrated_cache[key] = ''.join(map(chr, codes.tolist()))
+    return ramp
+
+
+def render_text_image(text, font_path=None, font_size=12, fg='white', bg='black'):
+    # Plain text drawn in the calibration font, so saved images show the
+    # same densities the ramp was built for
+    lines = ANSI_ESCAPE.sub('', text).split('\n')
+    font = glyph_font(font_path, font_size)
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    width = max(1, round(max(font.getlength(line) for line in lines)))
+    img = Image.new('RGB', (width, max(1, line_height * len(lines))), bg)
+    draw = ImageDraw.Draw(img)
+    for row, line in enumerate(lines):
+        draw.text((0, row * line_height), line, fill=fg, font=font)
+    return img
+
+
+# -------------------- Pipeline --------------------
+# 'fast' shrinks the source to a small multiple of the character grid before
+# adjustments and effects run; 'quality' keeps the full-resolution order.
+PIPELINE_MODES = ('fast', 'quality')
+OVERSAMPLE = 4
+
+
+def grid_size(size, output_width, zoom):
+    width, height = size
+    new_width = max(1, int(output_width * zoom))
+    new_height = int(new_width * (height / width) * 0.55)  # 0.55 to account for character aspect ratio
+    # Very wide images still get one row instead of an empty grid
+    return new_width, max(1, new_height)
+
+
+def prescale(img, grid, oversample=OVERSAMPLE):
+    # Returns the shrunk image and the scale applied, so radius-like
+    # parameters (blur, edge sigma) can be rescaled to match
+    target_width = grid[0] * oversample
+    if img.width <= target_width:
+        return img, 1.0
+    img = normalize_mode(img)
+    scale = target_width / img.width
+    target_height = max(1, round(img.height * scale))
+    return img.resize((target_width, target_height), Image.BOX), scale
+
+
+# -------------------- Conversion Settings --------------------
+# The CLI and the GUI describe their current settings with one mapping:
+# width, zoom, pipeline ('fast'/'quality'), char_set (SUBPIXEL_MODES keys
+# select the dense modes), chars, calibrate, shape_match, dither and
+# glyph_font (None = default font).
+def subpixel_mode(settings):
+    # Braille/half-block char sets sample several subpixels per character
+    if settings['char_set'] in SUBPIXEL_MODES:
+        return settings['char_set']
+    return None
+
+
+def glyph_tile(settings):
+    # Pixels sampled behind every cell for shape matching (None = off)
+    if settings['shape_match'] and not subpixel_mode(settings):
+        return GLYPH_TILE
+    return None
+
+
+def oversample(settings):
+    if glyph_tile(settings):
+        return max(OVERSAMPLE, GLYPH_TILE[0])
+    return OVERSAMPLE
+
+
+def decode_width(settings):
+    # Smallest source width the settings need (None = full resolution)
+    if settings['pipeline'] == 'quality':
+        return None
+    columns = int(settings['width'] * settings['zoom'])
+    if subpixel_mode(settings):
+        columns = subpixel_grid((columns, 1), subpixel_mode(settings))[0]
+    return columns * oversample(settings)
+
+
+def active_chars(settings):
+    # The char set, re-spread by measured glyph density unless disabled
+    if settings['calibrate']:
+        return calibrate_chars(settings['chars'], settings['glyph_font'])
+    return settings['chars']
+
+
+def cell_gray(cells, chars, settings, normalize=False):
+    # Glyph-selection luminance, dithered across the character ramp or
+    # replaced by the best-matching glyph shape
+    if cells.tiles is not None:
+        return shape_levels(cells.tiles, chars, settings['glyph_font'])
+    return dither(cells.gray(normalize), glyph_levels(chars)[0], settings['dither'])
+
+
+# -------------------- Image Loading --------------------
+MAX_IMAGE_PIXELS = 64_000_000
+
+
+def load_image(path, min_width=None, max_pixels=MAX_IMAGE_PIXELS):
+    # Decode at the smallest resolution that is still at least `min_width`
+    # wide (None = full resolution). JPEGs scale on decode via draft(),
+    # everything else is reduced by an integer factor after decoding.
+    # Returns the image and whether it was decoded below full resolution.
+    img = Image.open(path)
+    full_size = img.size
+    if min_width and img.width > min_width:
+        min_height = max(1, -(-min_width * img.height // img.width))
+        img.draft(None, (min_width, min_height))
+    
+    width, height = img.size
+    if max_pixels and width * height > max_pixels:
+        raise ValueError(f"Image is {width}x{height} ({width * height / 1e6:.1f} MP), "
+                         f"over the {max_pixels / 1e6:.1f} MP limit")
+    
+    img.load()
+    img = normalize_mode(img)
+    if min_width:
+        factor = img.width // min_width
+        if factor >= 2:
+            img = img.reduce(factor)
+    return img, img.size != full_size
+
+
+def normalize_mode(img):
+    # reduce(), resize() and the cell statistics expect 8-bit L/RGB/RGBA;
+    # wider grayscale is scaled down to 8 bits rather than clipped
+    if img.mode in ('L', 'RGB', 'RGBA'):
+        return img
+    if img.mode == '1':
+        return img.convert('L')
+    if img.mode.startswith('I') or img.mode == 'F':
+        gray = np.asarray(img, dtype=np.float64)
+        low, high = (float(gray.min()), float(gray.max())) if gray.size else (0.0, 0.0)
+        if img.mode.startswith('I;16'):
+            gray = gray / 257
+        elif img.mode == 'F':
+            # 0..1 floats, otherwise whatever range the data spans
+            if low >= 0 and high <= 1:
+                gray = gray * 255
+            elif high > low:
+                gray = (gray - low) * (255 / (high - low))
+        elif high > 255:
+            # 32-bit ints: by the data's maximum; 8-bit values stay as they are
+            gray = gray * (255 / high)
+        return Image.fromarray(np.clip(gray + 0.5, 0, 255).astype(np.uint8), 'L')
+    if img.mode in ('LA', 'La', 'PA', 'RGBa') or 'transparency' in img.info:
+        return img.convert('RGBA')
+    return img.convert('RGB')
+
+
+class SourceImage:
+    # Keeps the decoded source across setting changes and only decodes again
+    # when a setting needs more pixels than the current decode has.
+    def __init__(self, max_pixels=MAX_IMAGE_PIXELS):
+        self.max_pixels = max_pixels
+        self.path = None
+        self.image = None
+        self.min_width = None
+        self.reduced = False
+        self.version = 0  # bumped on every decode so caches can key on it
+    
+    def covers(self, path, min_width):
+        if self.image is None or path != self.path:
+            return False
+        if not self.reduced:
+            return True
+        return min_width is not None and min_width <= self.min_width
+    
+    def get(self, path, min_width=None):
+        if not self.covers(path, min_width):
+            self.image = None
+            self.image, self.reduced = load_image(path, min_width, self.max_pixels)
+            self.path = path
+            self.min_width = min_width
+            self.version += 1
+        return self.image
+    
+    def clear(self):
+        self.path = None
+        self.image = None
+
+
+# -------------------- Animation --------------------
+FRAME_MEMORY_BUDGET = 256 * 1024 * 1024  # decoded RGB frames kept, in bytes
+ART_MEMORY_BUDGET = 64 * 1024 * 1024  # converted frames kept, in characters
+
+
+class LRUCache:
+    # Least-recently-used mapping bounded by the total cost of its values
+    def __init__(self, max_cost, cost=len):
+        self.max_cost = max_cost
+        self.cost = cost
+        self.entries = OrderedDict()
+        self.total = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+    
+    def put(self, key, value):
+        if key in self.entries:
+            self.total -= self.cost(self.entries.pop(key))
+        self.entries[key] = value
+        self.total += self.cost(value)
+        while self.total > self.max_cost and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.total -= self.cost(evicted)
+    
+    def clear(self):
+        self.entries.clear()
+        self.total = 0
+
+
+def frame_bytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+def one_entry(value):
+    # LRUCache cost for caches bounded by entry count
+    return 1
+
+
+class AnimatedSource:
+    # Frames of an animated file, decoded lazily by a generator that only
+    # moves forward (seeking back restarts it). Decoded frames stay in an
+    # LRU bounded by a byte budget, across setting changes, until another
+    # file is opened.
+    def __init__(self, memory_budget=FRAME_MEMORY_BUDGET, max_pixels=MAX_IMAGE_PIXELS):
+        self.max_pixels = max_pixels
+        self.frames = LRUCache(memory_budget, frame_bytes)
+        self.path = None
+        self.n_frames = 0
+        self.decoder = None
+        self.next_index = 0
+    
+    def open(self, path):
+        if path == self.path:
+            return self
+        with Image.open(path) as img:
+            width, height = img.size
+            if self.max_pixels and width * height > self.max_pixels:
+                raise ValueError(f"Image is {width}x{height} ({width * height / 1e6:.1f} MP), "
+                                 f"over the {self.max_pixels / 1e6:.1f} MP limit")
+            self.n_frames = getattr(img, 'n_frames', 1)
+        self.frames.clear()
+        self.path = path
+        self.decoder = None
+        self.next_index = 0
+        return self
+    
+    def decode(self):
+        with Image.open(self.path) as img:
+            for index in range(self.n_frames):
+                img.seek(index)
+                yield index, img.convert('RGB')
+    
+    def frame(self, index):
+        frame = self.frames.get(index)
+        if frame is not None:
+            return frame
+        if self.decoder is None or index < self.next_index:
+            self.decoder = self.decode()
+            self.next_index = 0
+        for decoded_index, frame in self.decoder:
+            self.next_index = decoded_index + 1
+            self.frames.put(decoded_index, frame)
+            if decoded_index == index:
+                return frame
+        raise IndexError(f"Frame {index} out of range ({self.n_frames} frames)")
+    
+    def clear(self):
+        self.frames.clear()
+        self.path = None
+        self.decoder = None
+
+
+# -------------------- Raw Frame Streams --------------------
+def parse_frame_size(text):
+    # 'WIDTHxHEIGHT' -> (width, height)
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"Expected WIDTHxHEIGHT, got {text!r}")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Frame size must be positive, got {text!r}")
+    return width, height
+
+
+def read_raw_frames(stream, width, height):
+    # Packed rgb24 frames (e.g. ffmpeg -f rawvideo -pix_fmt rgb24) read
+    # into one reused buffer, so memory stays constant for any stream
+    # length. Each yielded image shares that buffer and is only valid until
+    # the next frame is read.
+    frame = bytearray(width * height * 3)
+    view = memoryview(frame)
+    while True:
+        filled = 0
+        while filled < len(frame):
+            count = stream.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        if filled == 0:
+            return
+        if filled < len(frame):
+            raise ValueError(f"Truncated frame: got {filled} of {len(frame)} bytes")
+        yield Image.frombuffer('RGB', (width, height), frame, 'raw', 'RGB', 0, 1)
+
+
+# -------------------- Terminal Playback --------------------
+def frame_changes(lines, previous):
+    # (row, column, text, whole) for every row that differs from the
+    # previous frame. Whole rows replace the line from column 0 and erase
+    # the rest; same-length plain rows keep only the span that differs.
+    for row, line in enumerate(lines):
+        old = previous[row] if row < len(previous) else None
+        if line == old:
+            continue
+        if old is None or '\033' in line or '\033' in old or len(line) != len(old):
+            yield row, 0, line, True
+            continue
+        start = len(os.path.commonprefix([line, old]))
+        end = len(line) - len(os.path.commonprefix([line[::-1], old[::-1]]))
+        yield row, start, line[start:end], False
+    for row in range(len(lines), len(previous)):
+        yield row, 0, "", True
+
+
+class TerminalRenderer:
+    # Redraws frames in place with cursor positioning: only rows that
+    # changed since the previous frame are rewritten (just the changed span
+    # for rows without escapes), and each frame goes out in one write.
+    def __init__(self, stream=None, max_rows=None):
+        self.stream = stream or sys.stdout
+        self.max_rows = max_rows
+        self.previous = []
+        self.frames = 0
+        self.bytes = 0
+    
+    def begin(self):
+        self.previous = []
+        self.write("\033[?25l\033[2J\033[H")
+    
+    def end(self):
+        self.write(f"\033[{len(self.previous) + 1};1H{ANSI_RESET}\033[?25h")
+    
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+        return len(data.encode('utf-8'))
+    
+    def render(self, text):
+        # Escape sequences that turn the previous frame into this one
+        lines = text.split('\n')
+        if self.max_rows:
+            lines = lines[:self.max_rows]
+        data = "".join(f"\033[{row + 1};{start + 1}H{span}" + ("\033[K" if whole else "")
+                       for row, start, span, whole in frame_changes(lines, self.previous))
+        self.previous = lines
+        return data
+    
+    def draw(self, text):
+        data = self.render(text)
+        size = self.write(data) if data else 0
+        self.frames += 1
+        self.bytes += size
+        return size
+
+
+class FrameScheduler:
+    # Deadline-based pacing at a target FPS. When a frame comes in late by
+    # whole intervals those slots are dropped instead of slowing playback.
+    def __init__(self, fps):
+        self.interval = 1.0 / fps
+        self.started = None
+        self.deadline = None
+        self.shown = 0
+        self.dropped = 0
+    
+    def start(self):
+        self.started = self.deadline = time.perf_counter()
+    
+    def wait(self):
+        # Returns how many frame slots to advance (1 + dropped frames)
+        self.shown += 1
+        self.deadline += self.interval
+        now = time.perf_counter()
+        if now < self.deadline:
+            time.sleep(self.deadline - now)
+            return 1
+        missed = int((now - self.deadline) / self.interval)
+        self.deadline += missed * self.interval
+        self.dropped += missed
+        return 1 + missed
+    
+    def fps(self):
+        elapsed = time.perf_counter() - self.started
+        return self.shown / elapsed if elapsed > 0 else 0.0
+
+
+# -------------------- Animation Export --------------------
+KEYFRAME_INTERVAL = 60  # frames between full redraws in exported animations
+
+
+class FrameRecorder(ABC):
+    # Writes converted frames to a file as they arrive, nothing is kept but
+    # the previous frame. Every `keyframe_interval` frames the whole frame
+    # is stored; frames in between carry only frame_changes().
+    def __init__(self, path, fps, keyframe_interval=KEYFRAME_INTERVAL):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.fps = fps
+        self.keyframe_interval = keyframe_interval
+        self.previous = []
+        self.frames = 0
+        self.keyframes = 0
+        self.bytes = 0
+        self.full_bytes = 0  # what storing every frame in full would take
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def write(self, data):
+        self.file.write(data)
+        self.bytes += len(data.encode('utf-8'))
+    
+    def add(self, text):
+        self.full_bytes += len(text.encode('utf-8'))
+        lines = text.split('\n')
+        keyframe = self.frames % self.keyframe_interval == 0
+        if self.frames == 0:
+            self.begin(lines)
+        changes = frame_changes(lines, [] if keyframe else self.previous)
+        self.write_frame(self.frames / self.fps, keyframe, changes)
+        self.previous = lines
+        self.frames += 1
+        self.keyframes += keyframe
+    
+    def begin(self, lines):
+        pass
+    
+    @abstractmethod
+    def write_frame(self, timestamp, keyframe, changes):
+        # One frame: the whole frame on keyframes, else the changed lines
+        pass
+    
+    def finish(self):
+        pass
+    
+    def close(self):
+        if not self.file.closed:
+            self.finish()
+            self.file.close()
+
+
+class TextRecorder(FrameRecorder):
+    # Plain text, every frame in full, separated by FRAME_SEPARATOR
+    def __init__(self, path, fps):
+        super().__init__(path, fps, keyframe_interval=1)
+    
+    def write_frame(self, timestamp, keyframe, changes):
+        # Every frame is a keyframe, so the changes are all of its rows
+        self.write('\n'.join(span for row, start, span, whole in changes) + FRAME_SEPARATOR)
+
+
+def visible_width(lines):
+    return max((len(ANSI_ESCAPE.sub('', line)) for line in lines), default=0)
+
+
+class CastRecorder(FrameRecorder):
+    # asciicast v2: a JSON header line, then one [time, "o", data] event
+    # per frame. Keyframes clear the screen and redraw every row.
+    def begin(self, lines):
+        header = {'version': 2, 'width': visible_width(lines), 'height': len(lines),
+                  'timestamp': int(time.time()), 'env': {'TERM': 'xterm-256color'}}
+        self.write(json.dumps(header) + '\n')
+    
+    def write_frame(self, timestamp, keyframe, changes):
+        data = "".join(f"\033[{row + 1};{start + 1}H{span}" + ("\033[K" if whole else "")
+                       for row, start, span, whole in changes)
+        if keyframe:
+            data = "\033[?25l\033[H\033[2J" + data
+        self.write(json.dumps([round(timestamp, 6), 'o', data]) + '\n')
+
+
+HTML_PLAYER_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>ASCII Art Animation</title>
+<style>
+body { background: #000; color: #ccc; margin: 0; }
+pre { font: 12px/1 'DejaVu Sans Mono', monospace; margin: 8px; cursor: pointer; }
+pre div { white-space: pre; height: 1em; }
+</style></head><body>
+<pre id="screen" title="Click to pause"></pre>
+<script>
+var FPS = %(fps)s, ANSI16 = %(ansi16)s, FRAMES = [];
+function F(changes, key) { FRAMES.push([changes, key]); }
+"""
+
+HTML_PLAYER_TAIL = r"""
+function xterm(n) {
+  if (n < 16) return ANSI16[n];
+  if (n >= 232) { var v = 8 + 10 * (n - 232); return [v, v, v]; }
+  var levels = [0, 95, 135, 175, 215, 255]; n -= 16;
+  return [levels[Math.floor(n / 36)], levels[Math.floor(n / 6) % 6], levels[n % 6]];
+}
+function escapeHtml(text) {
+  return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+}
+function rowHtml(line) {
+  // SGR escapes (reset, 16/256/truecolor, foreground and background) -> spans
+  var parts = line.split(/\x1b\[([0-9;]*)m/), out = escapeHtml(parts[0]), fg = null, bg = null;
+  for (var i = 1; i < parts.length; i += 2) {
+    var codes = parts[i].split(';').map(Number);
+    for (var j = 0; j < codes.length; j++) {
+      var c = codes[j], rgb = null;
+      if (c === 38 || c === 48) {
+        if (codes[j + 1] === 2) { rgb = codes.slice(j + 2, j + 5); j += 4; }
+        else { rgb = xterm(codes[j + 2]); j += 2; }
+        if (c === 38) fg = rgb; else bg = rgb;
+      }
+      else if (c === 0) fg = bg = null;
+      else if (c >= 30 && c <= 37) fg = ANSI16[c - 30];
+      else if (c >= 90 && c <= 97) fg = ANSI16[c - 82];
+      else if (c >= 40 && c <= 47) bg = ANSI16[c - 40];
+      else if (c >= 100 && c <= 107) bg = ANSI16[c - 92];
+    }
+    var text = escapeHtml(parts[i + 1]);
+    if (!text) continue;
+    var style = (fg ? 'color:rgb(' + fg + ');' : '') + (bg ? 'background:rgb(' + bg + ');' : '');
+    out += style ? '<span style="' + style + '">' + text + '</span>' : text;
+  }
+  return out;
+}
+var screen = document.getElementById('screen'), rows = [], lines = [], index = 0, paused = false;
+function show(changes, key) {
+  if (key) { screen.textContent = ''; rows = []; lines = []; }
+  for (var i = 0; i < changes.length; i++) {
+    var row = changes[i][0], start = changes[i][1], span = changes[i][2], whole = changes[i][3];
+    while (rows.length <= row) { rows.push(screen.appendChild(document.createElement('div'))); lines.push(''); }
+    var old = lines[row];
+    lines[row] = whole ? span : old.slice(0, start) + span + old.slice(start + span.length);
+    rows[row].innerHTML = rowHtml(lines[row]);
+  }
+}
+function tick() {
+  if (!paused && FRAMES.length) {
+    show(FRAMES[index][0], FRAMES[index][1]);
+    index = (index + 1) % FRAMES.length;
+  }
+  setTimeout(tick, 1000 / FPS);
+}
+screen.onclick = function () { paused = !paused; };
+tick();
+</script></body></html>
+"""
+
+
+class HtmlRecorder(FrameRecorder):
+    # Self-contained page: the player script, then one F(changes, keyframe)
+    # call per frame with its [row, column, text, whole] changes. The
+    # player clears the screen on keyframes, so looping back to frame 0
+    # redraws it.
+    def begin(self, lines):
+        self.write(HTML_PLAYER_HEAD % {'fps': json.dumps(self.fps),
+                                       'ansi16': json.dumps(ANSI16_COLORS)})
+    
+    def write_frame(self, timestamp, keyframe, changes):
+        changes = [[row, start, span, int(whole)] for row, start, span, whole in changes]
+        # "</" inside the script would end it early
+        data = json.dumps(changes, ensure_ascii=False).replace('</', '<\\/')
+        self.write(f"F({data}, {int(keyframe)});\n")
+    
+    def finish(self):
+        if self.frames:
+            self.write(HTML_PLAYER_TAIL)
+
+
+RECORDERS = {'.txt': TextRecorder, '.cast': CastRecorder, '.html': HtmlRecorder}
+
+
+# -------------------- Video Streaming --------------------
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+VIDEO_QUEUE_SIZE = 8
+FRAME_SEPARATOR = "\f\n"  # between frames in converted text files
+
+
+def is_video(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def open_video(path):
+    if cv2 is None:
+        raise RuntimeError("Video input needs OpenCV (pip install opencv-python)")
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    return capture
+
+
+def read_video_frame(path, index=0):
+    capture = open_video(path)
+    try:
+        if index:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ok, frame = capture.read()
+        if not ok:
+            raise ValueError(f"Cannot read frame {index} of {path}")
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        capture.release()
+
+
+def video_fps(path):
+    capture = open_video(path)
+    try:
+        return capture.get(cv2.CAP_PROP_FPS) or 25.0
+    finally:
+        capture.release()
+
+
+def video_frames(path):
+    # (index, frame) for every frame, decoded in order on the calling thread
+    capture = open_video(path)
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield index, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            index += 1
+    finally:
+        capture.release()
+
+
+class VideoStream:
+    # Decoding and conversion run on their own threads joined by bounded
+    # queues, so memory stays flat however long the video is. Iterating
+    # yields (index, converted) in order. skip_to() lets a realtime consumer
+    # drop frames: anything before that index is grabbed without decoding
+    # and never converted.
+    def __init__(self, path, convert, queue_size=VIDEO_QUEUE_SIZE):
+        self.capture = open_video(path)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 25.0
+        self.n_frames = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.convert = convert
+        self.decoded = queue.Queue(queue_size)
+        self.converted = queue.Queue(queue_size)
+        self.stopped = threading.Event()
+        self.min_index = 0
+        self.error = None
+        self.threads = [threading.Thread(target=self.decode_loop, daemon=True),
+                        threading.Thread(target=self.convert_loop, daemon=True)]
+    
+    def put(self, target, item):
+        # Blocking put that gives up once the stream is closed
+        while not self.stopped.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def take(self, source):
+        while not self.stopped.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+    
+    def decode_loop(self):
+        try:
+            index = 0
+            while not self.stopped.is_set():
+                if index < self.min_index:
+                    if not self.capture.grab():
+                        break
+                else:
+                    ok, frame = self.capture.read()
+                    if not ok:
+                        break
+                    img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    if not self.put(self.decoded, (index, img)):
+                        break
+                index += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.capture.release()
+            self.put(self.decoded, None)
+    
+    def convert_loop(self):
+        try:
+            while True:
+                item = self.take(self.decoded)
+                if item is None:
+                    break
+                index, img = item
+                if index >= self.min_index and not self.put(self.converted, (index, self.convert(img))):
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            self.put(self.converted, None)
+    
+    def skip_to(self, index):
+        self.min_index = index
+    
+    def __iter__(self):
+        for thread in self.threads:
+            thread.start()
+        try:
+            while True:
+                item = self.converted.get()
+                if item is None:
+                    break
+                if item[0] >= self.min_index:
+                    yield item
+        finally:
+            self.close()
+        if self.error is not None:
+            raise self.error
+    
+    def close(self):
+        self.stopped.set()
+        for thread in self.threads:
+            if thread.ident is None:
+                continue
+            thread.join(timeout=1)
+        if self.threads[0].ident is None:
+            self.capture.release()
+
+
+# -------------------- Parallel Conversion --------------------
+_worker_convert = None
+
+
+def _init_worker(convert):
+    global _worker_convert
+    _worker_convert = convert
+    # Ctrl+C reaches the whole process group; the parent shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def worker_pool(convert, workers=None):
+    # Process pool whose workers each receive `convert` once, at startup;
+    # module-level caches (char ramps, palette LUTs) stay warm between tasks
+    return ProcessPoolExecutor(workers or os.cpu_count() or 1, initializer=_init_worker,
+                               initargs=(convert,))
+
+
+def call_worker(*args):
+    # Task for a worker_pool(): runs its `convert`
+    return _worker_convert(*args)
+
+
+def _convert_shared(name, shape):
+    # Runs in a pool worker: the frame is read in place from shared memory
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        pixels = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        img = Image.fromarray(pixels)
+        try:
+            return _worker_convert(img)
+        finally:
+            del img, pixels
+    finally:
+        shm.close()
+
+
+class FramePool:
+    # Converts frames on a process pool. `convert` (img -> text) is sent to
+    # every worker once; decoded frames are copied into shared memory slots
+    # instead of being pickled, and map() yields results in input order with
+    # at most `window` frames in flight, so memory stays bounded.
+    def __init__(self, convert, workers=None, window=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.window = window or 2 * self.workers
+        self.executor = worker_pool(convert, self.workers)
+        self.free = []
+        self.slots = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def slot(self, size):
+        # A free shared memory block of at least `size` bytes
+        while self.free:
+            shm = self.free.pop()
+            if shm.size >= size:
+                return shm
+            self.slots.remove(shm)
+            shm.close()
+            shm.unlink()
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        self.slots.append(shm)
+        return shm
+    
+    def submit(self, img):
+        pixels = np.asarray(img)
+        shm = self.slot(pixels.nbytes)
+        np.ndarray(pixels.shape, dtype=np.uint8, buffer=shm.buf)[...] = pixels
+        return self.executor.submit(_convert_shared, shm.name, pixels.shape), shm
+    
+    def map(self, frames):
+        pending = deque()
+        try:
+            for img in frames:
+                if len(pending) >= self.window:
+                    future, shm = pending.popleft()
+                    yield future.result()
+                    self.free.append(shm)
+                pending.append(self.submit(img))
+            while pending:
+                future, shm = pending.popleft()
+                yield future.result()
+                self.free.append(shm)
+        finally:
+            for future, shm in pending:
+                future.cancel()
+    
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for shm in self.slots:
+            shm.close()
+            shm.unlink()
+        self.slots = []
+        self.free = []
+
+
+# -------------------- Batch Manifests --------------------
+# A manifest is JSONL, one {"input": path, "output": name?, "settings": {...}?}
+# per line. Shards split it by a hash of the input, so any number of
+# machines can take one shard each without coordinating. Every shard
+# appends one JSON line per finished item to its checkpoint log.
+def parse_shard(text):
+    # 'i/N' (1-based) -> (i, N)
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"Expected INDEX/COUNT, got {text!r}")
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, got {text!r}")
+    return index, count
+
+
+def shard_of(key, count):
+    # 1-based shard for `key`; stable across runs, machines and manifest order
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) % count + 1
+
+
+def read_jsonl(path):
+    # Records of a JSONL file. A torn last line (crash mid-write) is skipped.
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if line.endswith('\n'):
+                    raise ValueError(f"{path}:{number}: not valid JSON")
+
+
+def read_manifest(path, shard=(1, 1)):
+    # Items of one shard; relative inputs are relative to the manifest
+    base = os.path.dirname(os.path.abspath(path))
+    for item in read_jsonl(path):
+        if not isinstance(item, dict) or not isinstance(item.get('input'), str):
+            raise ValueError(f"{path}: every item needs an 'input' path, got {item!r}")
+        if shard_of(item['input'], shard[1]) == shard[0]:
+            yield dict(item, input=os.path.join(base, item['input']))
+
+
+class CheckpointLog:
+    # Append-only log of finished items for one shard. The last record for
+    # an output wins, so failed items are retried on the next run.
+    def __init__(self, path):
+        self.path = path
+        self.status = {}
+        if os.path.exists(path):
+            # Drop a line torn by a crash so new records start on their own line
+            with open(path, 'rb+') as f:
+                data = f.read()
+                if data and not data.endswith(b'\n'):
+                    f.truncate(data.rfind(b'\n') + 1)
+            for record in read_jsonl(path):
+                self.status[record['output']] = record['status']
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def done(self, output):
+        return self.status.get(output) == 'ok'
+    
+    def record(self, **record):
+        # One line per item, flushed at once so a crash loses at most it
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.status[record['output']] = record['status']
+    
+    def close(self):
+        self.file.close()
+
+
+def merge_checkpoints(paths):
+    # Final record per output for every checkpoint log, then per-log and
+    # total counts. Returns (stats by path, totals, final records).
+    final = {}
+    for path in paths:
+        for record in read_jsonl(path):
+            final[record['output']] = dict(record, log=path)
+    
+    def new_stats():
+        return {'ok': 0, 'failed': 0, 'bytes': 0, 'seconds': 0.0}
+    stats = {path: new_stats() for path in paths}
+    totals = new_stats()
+    for record in final.values():
+        for entry in (stats[record['log']], totals):
+            entry[record['status']] += 1
+            entry['bytes'] += record.get('bytes', 0)
+            entry['seconds'] += record.get('seconds', 0.0)
+    return stats, totals, final
+
+
+# -------------------- Folder Watching --------------------
+WATCH_SETTLE = 2.0  # seconds a file must stay unchanged before it is converted
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FolderWatcher:
+    # Polls a directory tree. A file is reported by poll() once its size and
+    # mtime have stayed the same for `settle` seconds (so half-written files
+    # wait) and its content hash differs from when it was last marked done.
+    # Only per-file signatures are kept, never file contents.
+    def __init__(self, root, extensions, settle=WATCH_SETTLE, skip=None):
+        self.root = root
+        self.extensions = extensions
+        self.settle = settle
+        self.skip = skip
+        self.pending = {}  # path -> ((mtime_ns, size), first seen with it)
+        self.done = {}  # path -> ((mtime_ns, size), sha1 or None)
+        self.busy = set()  # reported, not marked done yet
+    
+    def files(self):
+        # (path, (mtime_ns, size)) for every matching file below root
+        for folder, dirs, names in os.walk(self.root):
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            for name in names:
+                path = os.path.join(folder, name)
+                if not name.lower().endswith(self.extensions) or (self.skip and self.skip(path)):
+                    continue
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                yield path, (info.st_mtime_ns, info.st_size)
+    
+    def mark_done(self, path, signature, digest=None):
+        self.busy.discard(path)
+        self.done[path] = (signature, digest)
+    
+    def poll(self, now=None):
+        # (path, signature, digest) for files ready to convert; the caller
+        # passes them back to mark_done() when finished
+        now = time.monotonic() if now is None else now
+        ready = []
+        present = set()
+        for path, signature in self.files():
+            present.add(path)
+            done = self.done.get(path)
+            if path in self.busy or (done and done[0] == signature):
+                self.pending.pop(path, None)
+                continue
+            pending = self.pending.get(path)
+            if pending is None or pending[0] != signature:
+                self.pending[path] = (signature, now)
+                continue
+            if now - pending[1] < self.settle:
+                continue
+            del self.pending[path]
+            try:
+                digest = file_digest(path)
+            except OSError:
+                continue
+            if done and done[1] == digest:
+                # Touched or copied over with the same content
+                self.done[path] = (signature, digest)
+                continue
+            self.busy.add(path)
+            ready.append((path, signature, digest))
+        # Forget deleted files
+        for table in (self.pending, self.done):
+            for path in [path for path in table if path not in present]:
+                del table[path]
+        return ready
+
+
+# -------------------- Conversion Cache --------------------
+ART_CACHE_VERSION = 1  # bump when the same settings start rendering differently
+ART_CACHE_SIZE = 512 * 1024 * 1024
+
+
+class ArtCache:
+    # Content-addressed results on disk: keys hash the source bytes with the
+    # canonical settings, so renamed or copied files still hit. Entries are
+    # written to a temp file and renamed into place, so concurrent workers
+    # only ever see whole files. A hit refreshes the entry's mtime and trim()
+    # drops the least recently used entries once max_bytes is exceeded.
+    def __init__(self, root=None, max_bytes=ART_CACHE_SIZE, store_cells=False):
+        self.root = root or os.path.join(CACHE_DIR, 'art')
+        self.max_bytes = max_bytes
+        self.store_cells = store_cells
+        self.counts = {'hits': 0, 'misses': 0, 'cell_hits': 0, 'cell_misses': 0, 'evictions': 0}
+        self.written = 0
+    
+    def key(self, *parts):
+        canonical = json.dumps([ART_CACHE_VERSION, *parts], separators=(',', ':'), default=repr)
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+    
+    def path(self, key, suffix):
+        return os.path.join(self.root, key[:2], key + suffix)
+    
+    def read(self, key, suffix, load, counter):
+        path = self.path(key, suffix)
+        try:
+            value = load(path)
+        except (OSError, ValueError, KeyError):
+            self.counts[f'{counter}misses'] += 1
+            return None
+        self.counts[f'{counter}hits'] += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+    
+    def write(self, key, suffix, save):
+        path = self.path(key, suffix)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save(tmp_path)
+            os.replace(tmp_path, path)
+            self.written += os.path.getsize(path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        if self.written > self.max_bytes // 16:
+            self.trim()
+    
+    def get_art(self, key):
+        def load(path):
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        return self.read(key, '.txt', load, '')
+    
+    def put_art(self, key, text):
+        def save(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        self.write(key, '.txt', save)
+    
+    def get_cells(self, key):
+        def load(path):
+            with np.load(path) as arrays:
+                return CellGrid.from_arrays({name: arrays[name] for name in arrays.files})
+        return self.read(key, '.npz', load, 'cell_')
+    
+    def put_cells(self, key, cells):
+        def save(path):
+            with open(path, 'wb') as f:
+                np.savez(f, **cells.arrays())
+        self.write(key, '.npz', save)
+    
+    def entries(self):
+        # (mtime, size, path) of every entry; temp files left by killed
+        # writers are removed once they are an hour old
+        now = time.time()
+        for folder, dirs, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(folder, name)
+                try:
+                    info = os.stat(path)
+                    if name.endswith('.tmp'):
+                        if now - info.st_mtime > 3600:
+                            os.remove(path)
+                        continue
+                except OSError:
+                    continue
+                yield info.st_mtime, info.st_size, path
+    
+    def trim(self):
+        # Evict down to 90% of max_bytes, oldest use first. Other processes
+        # may be trimming too; entries already gone are skipped.
+        self.written = 0
+        entries = sorted(self.entries())
+        total = sum(size for mtime, size, path in entries)
+        if total <= self.max_bytes:
+            return
+        for mtime, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                self.counts['evictions'] += 1
+            except OSError:
+                pass
+            total -= size
+    
+    def usage(self):
+        # (entries, bytes) currently on disk
+        sizes = [size for mtime, size, path in self.entries()]
+        return len(sizes), sum(sizes)
+    
+    def summary(self):
+        counts = self.counts
+        text = f"{counts['hits']} hits, {counts['misses']} misses"
+        if self.store_cells:
+            text += f", cells {counts['cell_hits']} hits / {counts['cell_misses']} misses"
+        if counts['evictions']:
+            text += f", {counts['evictions']} evicted"
+        return text
+    
+    def clear(self):
+        for mtime, size, path in list(self.entries()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# -------------------- Conversion Service --------------------
+SERVICE_QUEUE_SIZE = 32
+LATENCY_WINDOW = 1024  # most recent requests the percentiles cover
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class ConversionService:
+    # Conversions for concurrent callers on a worker_pool(). Requests with
+    # the same key while one is in flight share its future instead of
+    # converting again; at most `queue_size` distinct conversions are queued
+    # or running, beyond that submit() raises ServiceBusy.
+    def __init__(self, convert, workers=None, queue_size=SERVICE_QUEUE_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = worker_pool(convert, self.workers)
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.started = time.time()
+        self.counts = {'requests': 0, 'conversions': 0, 'coalesced': 0, 'rejected': 0, 'errors': 0}
+    
+    def warm(self, *args):
+        # Start every worker and fill its caches before the first request
+        for future in [self.pool.submit(call_worker, *args) for _ in range(self.workers)]:
+            future.result()
+    
+    def submit(self, key, *args):
+        # (future, coalesced) for a request; the future's result is shared
+        with self.lock:
+            self.counts['requests'] += 1
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.counts['coalesced'] += 1
+                return future, True
+            if len(self.in_flight) >= self.queue_size:
+                self.counts['rejected'] += 1
+                raise ServiceBusy(f"{len(self.in_flight)} conversions queued")
+            future = self.in_flight[key] = self.pool.submit(call_worker, *args)
+            self.counts['conversions'] += 1
+        future.add_done_callback(lambda done: self.finish(key))
+        return future, False
+    
+    def finish(self, key):
+        with self.lock:
+            self.in_flight.pop(key, None)
+    
+    def record(self, seconds, ok=True):
+        with self.lock:
+            self.latencies.append(seconds)
+            if not ok:
+                self.counts['errors'] += 1
+    
+    def metrics(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            metrics = dict(self.counts, in_flight=len(self.in_flight), queue_size=self.queue_size,
+                           workers=self.workers, uptime=round(time.time() - self.started, 1))
+        if latencies.size:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            metrics['latency_ms'] = {'p50': round(p50, 2), 'p90': round(p90, 2), 'p99': round(p99, 2),
+                                     'max': round(latencies.max(), 2), 'window': int(latencies.size)}
+        return metrics
+    
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+# -------------------- Color Matrices --------------------
+def duotone_matrix(dark, light):
+    # Luminance mapped linearly from `dark` to `light`
+    return tuple(
+        (0.299 * (hi - lo) / 255, 0.587 * (hi - lo) / 255, 0.114 * (hi - lo) / 255, lo)
+        for lo, hi in zip(dark, light)
+    )
+
+
+# Rows are (r, g, b, offset) for each output channel
+COLOR_MATRICES = {
+    'sepia': ((0.393, 0.769, 0.189, 0),
+              (0.349, 0.686, 0.168, 0),
+              (0.272, 0.534, 0.131, 0)),
+    'warm': ((1.08, 0, 0, 10),
+             (0, 1.0, 0, 4),
+             (0, 0, 0.85, 0)),
+    'cool': ((0.88, 0, 0, 0),
+             (0, 0.98, 0, 4),
+             (0, 0, 1.08, 14)),
+    'duotone': duotone_matrix((25, 35, 80), (255, 214, 160)),
+}
+
+
+def apply_color_matrix(img, matrix):
+    rgb = np.asarray(img.convert('RGB'), dtype=np.float64)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    out = np.empty(rgb.shape, dtype=np.uint8)
+    for channel, (mr, mg, mb, offset) in enumerate(matrix):
+        out[..., channel] = np.clip(mr * r + mg * g + mb * b + offset, 0, 255).astype(np.uint8)
+    return Image.fromarray(out)
+
+
+# -------------------- Point Operations --------------------
+# Contrast, brightness and invert are all per-value maps, so they are fused
+# into one 256-entry table and applied with a single Image.point pass.
+_point_lut_cache = {}
+_POINT_LUT_CACHE_SIZE = 512
+IDENTITY_LUT = list(range(256))
+
+
+def _blend(base, values, factor):
+    # Same float32 interpolation, clipping and truncation as Image.blend
+    base = np.float32(base)
+    temp = base + np.float32(factor) * (values - base)
+    return np.floor(np.clip(temp, 0, 255))
+
+
+def point_lut(contrast=1.0, brightness=1.0, invert=False, mean=0):
+    key = (contrast, brightness, invert, mean)
+    lut = _point_lut_cache.get(key)
+    if lut is None:
+        values = np.arange(256, dtype=np.float32)
+        if contrast != 1.0:
+            values = _blend(mean, values, contrast)
+        if brightness != 1.0:
+            values = _blend(0, values, brightness)
+        if invert:
+            values = 255 - values
+        lut = values.astype(np.uint8).tolist()
+        if len(_point_lut_cache) >= _POINT_LUT_CACHE_SIZE:
+            _point_lut_cache.clear()
+        _point_lut_cache[key] = lut
+    return lut
+
+
+def apply_point_ops(img, contrast=1.0, brightness=1.0, invert=False):
+    if contrast == 1.0 and brightness == 1.0 and not invert:
+        return img
+    if img.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+        img = img.convert('RGB')
+    
+    mean = 0
+    if contrast != 1.0:
+        # ImageEnhance.Contrast blends towards the rounded mean of the L image
+        gray = img if img.mode == 'L' else img.convert('L')
+        mean = int(ImageStat.Stat(gray).mean[0] + 0.5)
+    
+    lut = point_lut(contrast, brightness, invert, mean)
+    table = []
+    for band in img.getbands():
+        table += IDENTITY_LUT if band == 'A' else lut
+    return img.point(table)
+
+
+# -------------------- Edge Detection --------------------
+# 'cv2' and 'sobel' are the fast backends; 'skimage' is the original canny.
+EDGE_BACKENDS = ('cv2', 'sobel', 'skimage')
+SOBEL_THRESHOLD = 0.15 * 4 * 255
+# Line orientation bins (0, 45, 90, 135 degrees, y pointing down)
+DIRECTION_GLYPHS = np.array([ord(c) for c in '-\\|/'], dtype=np.uint32)
+
+
+def smooth(gray, sigma):
+    if sigma <= 0:
+        return gray
+    return np.asarray(Image.fromarray(gray).filter(ImageFilter.GaussianBlur(sigma)))
+
+
+def sobel(gray):
+    p = np.pad(gray.astype(np.float32), 1, mode='edge')
+    gx = (p[:-2, 2:] + 2 * p[1:-1, 2:] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[1:-1, :-2] + p[2:, :-2])
+    gy = (p[2:, :-2] + 2 * p[2:, 1:-1] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[:-2, 1:-1] + p[:-2, 2:])
+    return gx, gy
+
+
+def find_edges(gray, sigma=1.0, backend='cv2'):
+    # gray: 2D uint8 array -> 2D uint8 edge map (0 or 255)
+    if (backend == 'cv2' and cv2 is None) or (backend == 'skimage' and feature is None):
+        backend = 'sobel'
+    
+    if backend == 'skimage':
+        edges = feature.canny(gray / 255., sigma=sigma)
+        return (edges * 255).astype(np.uint8)
+    
+    if backend == 'cv2':
+        if sigma > 0:
+            gray = cv2.GaussianBlur(gray, (0, 0), sigma)
+        return cv2.Canny(gray, 50, 100)
+    
+    gx, gy = sobel(smooth(gray, sigma))
+    return np.where(np.hypot(gx, gy) >= SOBEL_THRESHOLD, 255, 0).astype(np.uint8)
+
+
+def direction_glyphs(cells, density=0.08):
+    # Per-cell dominant edge direction from the averaged structure tensor.
+    # Returns codepoints of - \ | / for cells with enough edge pixels, 0 elsewhere.
+    jxx, jyy, jxy = cells.tensor
+    gradient_angle = 0.5 * np.arctan2(2 * jxy, jxx - jyy)
+    line_angle = np.degrees(gradient_angle) + 90
+    bins = np.round(line_angle / 45).astype(np.int64) % 4
+    has_edge = cells.luminance / 255 >= density
+    return np.where(has_edge, DIRECTION_GLYPHS[bins], 0)
+
+
+# -------------------- Cell Statistics --------------------
+def cell_bounds(length, cells):
+    # Start offset of each of `cells` near-equal spans covering `length`
+    return (np.arange(cells) * length) // cells
+
+
+class CellGrid:
+    # Per-cell statistics of a processed image over the character grid.
+    # Every channel is box-summed in one reduceat pass, so renderers for any
+    # color mode or char set read from here without touching pixels again.
+    def __init__(self, img, grid, tile=None):
+        width, height = grid
+        
+        # Optional grayscale tile of tile[0] x tile[1] pixels per cell, as
+        # rows x cols x pixels for shape matching
+        self.tiles = None
+        if tile is not None:
+            tile_width, tile_height = tile
+            pixels = img.convert('L').resize((width * tile_width, height * tile_height), Image.BOX)
+            tiles = np.asarray(pixels, dtype=np.float32) / 255
+            tiles = tiles.reshape(height, tile_height, width, tile_width).transpose(0, 2, 1, 3)
+            self.tiles = tiles.reshape(height, width, tile_width * tile_height)
+        
+        img, _ = prescale(img, grid)
+        if img.width < width or img.height < height:
+            img = img.resize((max(img.width, width), max(img.height, height)))
+        
+        # Channel-first stack: r, g, b, lum, lum^2, |grad|, gx^2, gy^2, gx*gy
+        channels = np.empty((9, img.height, img.width), dtype=np.float32)
+        channels[:3] = np.moveaxis(np.asarray(img.convert('RGB')), -1, 0)
+        r, g, b, lum = channels[0], channels[1], channels[2], channels[3]
+        np.multiply(r, 0.2989, out=lum)
+        lum += 0.5870 * g
+        lum += 0.1140 * b
+        np.multiply(lum, lum, out=channels[4])
+        gx, gy = sobel(lum)
+        np.hypot(gx, gy, out=channels[5])
+        np.multiply(gx, gx, out=channels[6])
+        np.multiply(gy, gy, out=channels[7])
+        np.multiply(gx, gy, out=channels[8])
+        
+        rows = cell_bounds(img.height, height)
+        cols = cell_bounds(img.width, width)
+        sums = np.add.reduceat(np.add.reduceat(channels, rows, axis=1), cols, axis=2)
+        counts = np.outer(np.diff(np.append(rows, img.height)), np.diff(np.append(cols, img.width)))
+        means = sums / counts
+        
+        self.grid = grid
+        self.rgb = np.moveaxis(means[:3], 0, -1)
+        self.luminance = means[3]
+        self.variance = np.maximum(means[4] - self.luminance ** 2, 0)
+        self.edge_energy = means[5]
+        self.tensor = (means[6], means[7], means[8])
+    
+    def arrays(self):
+        # Everything the renderers read, as named arrays (for np.savez)
+        arrays = {'grid': np.array(self.grid), 'rgb': self.rgb, 'luminance': self.luminance,
+                  'variance': self.variance, 'edge_energy': self.edge_energy,
+                  'tensor': np.stack(self.tensor)}
+        if self.tiles is not None:
+            arrays['tiles'] = self.tiles
+        return arrays
+    
+    @classmethod
+    def from_arrays(cls, arrays):
+        cells = cls.__new__(cls)
+        cells.grid = tuple(arrays['grid'].tolist())
+        cells.rgb = arrays['rgb']
+        cells.luminance = arrays['luminance']
+        cells.variance = arrays['variance']
+        cells.edge_energy = arrays['edge_energy']
+        cells.tensor = tuple(arrays['tensor'])
+        cells.tiles = arrays['tiles'] if 'tiles' in arrays else None
+        return cells
+    
+    def gray(self, normalize=False):
+        # normalize stretches the brightest cell to 255 (thin edges average
+        # out to faint cells otherwise)
+        lum = self.luminance
+        if normalize and lum.max() > 0:
+            lum = lum * (255 / lum.max())
+        return np.clip(np.rint(lum), 0, 255).astype(np.uint8)
+    
+    def colors(self):
+        return np.clip(np.rint(self.rgb), 0, 255).astype(np.uint8)
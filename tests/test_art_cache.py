@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from ascii_engine import ArtCache, CellGrid
+
+
+def test_keys_follow_content_and_settings(tmp_path):
+    cache = ArtCache(str(tmp_path))
+    assert cache.key('abc', (80, 'basic')) == cache.key('abc', (80, 'basic'))
+    assert cache.key('abc', (80, 'basic')) != cache.key('abc', (81, 'basic'))
+    assert cache.key('abc', (80, 'basic')) != cache.key('abd', (80, 'basic'))
+
+
+def test_art_round_trip(tmp_path):
+    cache = ArtCache(str(tmp_path))
+    key = cache.key('digest', 'settings')
+    assert cache.get_art(key) is None
+    cache.put_art(key, "ab\nçd ⣿")
+    assert cache.get_art(key) == "ab\nçd ⣿"
+    assert cache.counts['hits'] == 1 and cache.counts['misses'] == 1
+    assert cache.usage()[0] == 1
+
+
+def test_cells_round_trip(tmp_path):
+    cache = ArtCache(str(tmp_path), store_cells=True)
+    img = Image.fromarray(np.random.default_rng(2).integers(0, 256, (64, 96, 3), dtype=np.uint8))
+    cells = CellGrid(img, (12, 8))
+    key = cache.key('digest')
+    cache.put_cells(key, cells)
+    loaded = cache.get_cells(key)
+    assert (loaded.gray() == cells.gray()).all()
+    assert (loaded.colors() == cells.colors()).all()
+    assert cache.counts['cell_hits'] == 1
+
+
+def test_failed_writes_leave_nothing_behind(tmp_path):
+    cache = ArtCache(str(tmp_path))
+    key = cache.key('digest')
+    
+    def save(path):
+        with open(path, 'w') as f:
+            f.write("partial")
+        raise OSError("disk full")
+    cache.write(key, '.txt', save)
+    assert cache.get_art(key) is None
+    assert [name for folder, dirs, names in os.walk(tmp_path) for name in names] == []
+
+
+def test_trim_evicts_least_recently_used(tmp_path):
+    cache = ArtCache(str(tmp_path), max_bytes=10 ** 9)
+    keys = [cache.key(i) for i in range(10)]
+    for age, key in enumerate(keys):
+        cache.put_art(key, "x" * 1000)
+        # Older keys were used longer ago
+        stamp = 1_000_000 + age
+        os.utime(cache.path(key, '.txt'), (stamp, stamp))
+    # A hit makes the oldest entry the most recently used one
+    assert cache.get_art(keys[0]) is not None
+    cache.max_bytes = 5000
+    cache.trim()
+    left = [key for key in keys if cache.get_art(key) is not None]
+    assert len(left) == 4 and keys[0] in left and left[1:] == keys[7:]
+    assert cache.counts['evictions'] == 6
+
+
+def test_writes_trim_on_their_own(tmp_path):
+    cache = ArtCache(str(tmp_path), max_bytes=16 * 1000)
+    for i in range(40):
+        cache.put_art(cache.key(i), "x" * 1000)
+    assert cache.usage()[1] <= 16 * 1000
+
+
+def test_stale_temp_files_are_cleaned_up(tmp_path):
+    cache = ArtCache(str(tmp_path))
+    cache.put_art(cache.key('a'), "art")
+    folder = os.path.dirname(cache.path(cache.key('a'), '.txt'))
+    fresh, stale = os.path.join(folder, 'fresh.tmp'), os.path.join(folder, 'stale.tmp')
+    for path in (fresh, stale):
+        with open(path, 'w') as f:
+            f.write("partial")
+    os.utime(stale, (0, 0))
+    assert cache.usage() == (1, 3)
+    assert os.path.exists(fresh) and not os.path.exists(stale)
+    cache.clear()
+    assert cache.usage() == (0, 0)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from ascii_engine import char_lut, grid_to_text, render_chars
+
+CHAR_SETS = [" .,:;+*?%S#@", " ░▒▓█", "@#S%?*+;:,. ", "⠀⠁⠃⠇⡇⣇⣧⣷⣿", "ab", "#"]
+
+
+def per_pixel(pixels, chars):
+    # The original row-by-row mapping the lookup table replaced
+    char_len = len(chars)
+    return "\n".join("".join(chars[min(int(pixel * (char_len - 1) / 255), char_len - 1)] for pixel in row)
+                     for row in pixels)
+
+
+@pytest.mark.parametrize('chars', CHAR_SETS)
+def test_matches_the_per_pixel_mapping(chars):
+    pixels = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    assert render_chars(pixels, chars) == per_pixel(pixels.tolist(), chars)
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (37, 53), dtype=np.uint8)
+    assert render_chars(pixels, chars) == per_pixel(pixels.tolist(), chars)
+
+
+def test_narrow_sets_use_byte_tables():
+    assert char_lut(" .:#").dtype == np.uint8
+    assert char_lut(" ░▒▓█").itemsize == 4
+
+
+def test_overlay_replaces_only_marked_cells():
+    pixels = np.zeros((2, 3), dtype=np.uint8)
+    overlay = np.array([[0, ord('|'), 0], [ord('-'), 0, 0]], dtype=np.uint32)
+    assert render_chars(pixels, " @", overlay) == " | \n-  "
+
+
+def test_grid_to_text_rows():
+    codes = np.array([[ord('a'), ord('b')], [ord('c'), ord('d')]], dtype=np.uint32)
+    assert grid_to_text(codes) == "ab\ncd"
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from ascii_engine import CheckpointLog, merge_checkpoints, parse_shard, read_manifest, shard_of
+
+
+def test_parse_shard():
+    assert parse_shard('2/4') == (2, 4)
+    for text in ('0/4', '5/4', '2', 'a/b'):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_shards_are_stable_and_cover_everything():
+    keys = [f"photos/{i:04d}.jpg" for i in range(1000)]
+    shards = [shard_of(key, 4) for key in keys]
+    assert shards == [shard_of(key, 4) for key in keys]
+    assert set(shards) == {1, 2, 3, 4}
+    # Roughly even split
+    assert all(200 < shards.count(shard) < 300 for shard in (1, 2, 3, 4))
+    assert all(shard_of(key, 1) == 1 for key in keys)
+
+
+def test_manifest_shards_partition_the_items(tmp_path):
+    manifest = tmp_path / 'jobs.jsonl'
+    manifest.write_text(''.join(json.dumps({'input': f"{i}.png"}) + '\n' for i in range(50)))
+    parts = [[item['input'] for item in read_manifest(str(manifest), (index, 3))] for index in (1, 2, 3)]
+    every = [item['input'] for item in read_manifest(str(manifest))]
+    assert sorted(sum(parts, [])) == sorted(every)
+    assert every[0] == str(tmp_path / '0.png')
+
+
+def test_manifest_items_need_an_input(tmp_path):
+    manifest = tmp_path / 'jobs.jsonl'
+    manifest.write_text('{"output": "a.txt"}\n')
+    with pytest.raises(ValueError):
+        list(read_manifest(str(manifest)))
+
+
+def test_resume_after_a_torn_last_line(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    with CheckpointLog(str(path)) as log:
+        log.record(input='a.png', output='a.txt', status='ok')
+        log.record(input='b.png', output='b.txt', status='failed', error='boom')
+    # A crash in the middle of the next record
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"input": "c.png", "outp')
+    
+    with CheckpointLog(str(path)) as log:
+        assert log.done('a.txt')
+        assert not log.done('b.txt')
+        assert not log.done('c.txt')
+        log.record(input='b.png', output='b.txt', status='ok')
+        log.record(input='c.png', output='c.txt', status='ok')
+    
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [record['output'] for record in records] == ['a.txt', 'b.txt', 'b.txt', 'c.txt']
+    with CheckpointLog(str(path)) as log:
+        assert all(log.done(name) for name in ('a.txt', 'b.txt', 'c.txt'))
+
+
+def test_broken_lines_in_the_middle_are_errors(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    path.write_text('{"output": "a.txt", "status": "ok"}\nnot json\n{"output": "b.txt", "status": "ok"}\n')
+    with pytest.raises(ValueError):
+        CheckpointLog(str(path))
+
+
+def test_merge_keeps_the_last_record_per_output(tmp_path):
+    first, second = tmp_path / 'one.jsonl', tmp_path / 'two.jsonl'
+    with CheckpointLog(str(first)) as log:
+        log.record(input='a.png', output='a.txt', status='failed', error='boom')
+        log.record(input='b.png', output='b.txt', status='ok', bytes=100, seconds=0.5)
+    with CheckpointLog(str(second)) as log:
+        log.record(input='a.png', output='a.txt', status='ok', bytes=50, seconds=0.25)
+    stats, totals, final = merge_checkpoints([str(first), str(second)])
+    assert totals == {'ok': 2, 'failed': 0, 'bytes': 150, 'seconds': 0.75}
+    assert stats[str(first)]['ok'] == 1 and stats[str(second)]['ok'] == 1
+    assert final['a.txt']['log'] == str(second)
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from ascii_engine import quantize_colors
+
+
+@pytest.mark.parametrize('step', [2, 3, 5, 16, 100, 200, 255])
+def test_quantized_colors_stay_in_range(step):
+    rgb = np.array([[[0, 128, 255], [255, 255, 255]]], dtype=np.uint8)
+    out = quantize_colors(rgb, step)
+    assert out.dtype == np.uint8
+    # Every channel lands in its bucket, so white stays the brightest value
+    assert (out[..., 2] >= 255 // step * step).all()
+    assert out[0, 1].tolist() == [min(255 // step * step + step // 2, 255)] * 3
+    assert (np.abs(out.astype(int) - rgb) <= step).all()
+
+
+def test_all_values_are_monotonic():
+    rgb = np.arange(256, dtype=np.uint8).reshape(1, 256, 1).repeat(3, axis=2)
+    for step in range(1, 256):
+        assert (np.diff(quantize_colors(rgb, step)[0, :, 0].astype(int)) >= 0).all()
+
+
+def test_step_one_keeps_colors():
+    rgb = np.arange(256, dtype=np.uint8).reshape(1, 256, 1).repeat(3, axis=2)
+    assert quantize_colors(rgb, 1) is rgb
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from ascii_engine import (DITHER_MODES, dither, glyph_levels, char_lut, calibrate_chars,
+                          render_chars)
+
+CHAR_SETS = [" .,:;+*?%S#@", " ░▒▓█", "@#S%?*+;:,. ",
+             " `.-':_,^=;><+!rc*/z?sLTv)J7(|Fi{C}fI31tlu[neoZ5Yxjya]2ESwqkP6h9d4VpOGbUAKXHm8RD#$Bg0MNWQ%&@"]
+
+
+def glyph_indices(chars, gray):
+    glyphs = glyph_levels(chars)[1]
+    return np.array([glyphs.index(chr(code)) for code in char_lut(chars)[gray].ravel()])
+
+
+@pytest.mark.parametrize('mode', DITHER_MODES)
+@pytest.mark.parametrize('calibrate', [True, False])
+@pytest.mark.parametrize('chars', CHAR_SETS)
+def test_flat_images_stay_flat(chars, calibrate, mode):
+    if calibrate:
+        chars = calibrate_chars(chars)
+    levels = glyph_levels(chars)[0]
+    for value in (0, 255):
+        gray = np.full((32, 48), value, dtype=np.uint8)
+        text = render_chars(dither(gray, levels, mode), chars)
+        assert text == render_chars(gray, chars)
+
+
+@pytest.mark.parametrize('mode', DITHER_MODES[1:])
+def test_dithering_only_mixes_neighbouring_glyphs(mode):
+    chars = calibrate_chars(" ░▒▓█")
+    levels, glyphs = glyph_levels(chars)
+    gray = np.tile(np.arange(256, dtype=np.uint8), (16, 1))
+    plain = glyph_indices(chars, gray)
+    dithered = glyph_indices(chars, dither(gray, levels, mode))
+    assert set(dithered - plain) <= {0, 1}
+
+
+@pytest.mark.parametrize('mode', DITHER_MODES[1:])
+def test_halfway_between_glyphs_mixes_evenly(mode):
+    chars = calibrate_chars(" ░▒▓█")
+    levels = glyph_levels(chars)[0]
+    middle = (int(levels[1]) + int(levels[2])) // 2
+    gray = np.full((64, 64), middle, dtype=np.uint8)
+    assert glyph_indices(chars, dither(gray, levels, mode)).mean() == pytest.approx(1.5, abs=0.05)
@@ -0,0 +1,98 @@
+import os
+
+from ascii_engine import FolderWatcher
+
+SETTLE = 2.0
+
+
+def write(path, data, mtime):
+    path.write_bytes(data)
+    os.utime(path, ns=(int(mtime * 1e9), int(mtime * 1e9)))
+
+
+def settle(watcher, start):
+    # First poll records the signature, the second one is past the settle time
+    assert watcher.poll(now=start) == []
+    return watcher.poll(now=start + SETTLE)
+
+
+def finish(watcher, ready):
+    for path, signature, digest in ready:
+        watcher.mark_done(path, signature, digest)
+
+
+def test_new_file_waits_until_it_settles(tmp_path):
+    image = tmp_path / 'a.png'
+    write(image, b'one', 1000)
+    watcher = FolderWatcher(str(tmp_path), ('.png',), SETTLE)
+    assert watcher.poll(now=0) == []
+    assert watcher.poll(now=SETTLE - 0.1) == []
+    ready = watcher.poll(now=SETTLE)
+    assert [path for path, signature, digest in ready] == [str(image)]
+
+
+def test_writes_in_progress_restart_the_debounce(tmp_path):
+    image = tmp_path / 'a.png'
+    write(image, b'one', 1000)
+    watcher = FolderWatcher(str(tmp_path), ('.png',), SETTLE)
+    assert watcher.poll(now=0) == []
+    write(image, b'one two', 1001)
+    assert watcher.poll(now=SETTLE) == []
+    assert watcher.poll(now=2 * SETTLE - 0.1) == []
+    assert len(watcher.poll(now=2 * SETTLE)) == 1
+
+
+def test_busy_files_are_not_reported_twice(tmp_path):
+    write(tmp_path / 'a.png', b'one', 1000)
+    watcher = FolderWatcher(str(tmp_path), ('.png',), SETTLE)
+    assert len(settle(watcher, 0)) == 1
+    assert watcher.poll(now=10) == []
+    assert watcher.poll(now=20) == []
+
+
+def test_touch_without_changes_is_skipped(tmp_path):
+    image = tmp_path / 'a.png'
+    write(image, b'one', 1000)
+    watcher = FolderWatcher(str(tmp_path), ('.png',), SETTLE)
+    finish(watcher, settle(watcher, 0))
+    write(image, b'one', 2000)
+    assert settle(watcher, 10) == []
+    # The new signature is remembered, so the file is not hashed again
+    assert watcher.done[str(image)][0] == (int(2000 * 1e9), 3)
+    assert watcher.poll(now=20) == []
+
+
+def test_changed_content_is_reconverted(tmp_path):
+    image = tmp_path / 'a.png'
+    write(image, b'one', 1000)
+    watcher = FolderWatcher(str(tmp_path), ('.png',), SETTLE)
+    first = settle(watcher, 0)
+    finish(watcher, first)
+    write(image, b'two', 2000)
+    second = settle(watcher, 10)
+    assert [path for path, signature, digest in second] == [str(image)]
+    assert second[0][2] != first[0][2]
+
+
+def test_files_marked_done_up_front_are_not_converted(tmp_path):
+    write(tmp_path / 'a.png', b'one', 1000)
+    watcher = FolderWatcher(str(tmp_path), ('.png',), SETTLE)
+    for path, signature in watcher.files():
+        watcher.mark_done(path, signature)
+    assert settle(watcher, 0) == []
+
+
+def test_filters_and_deleted_files(tmp_path):
+    (tmp_path / '.hidden').mkdir()
+    (tmp_path / 'sub').mkdir()
+    for name in ('a.PNG', 'notes.txt', 'a.ascii.png', '.hidden/b.png', 'sub/c.png'):
+        write(tmp_path / name, b'x', 1000)
+    watcher = FolderWatcher(str(tmp_path), ('.png',), SETTLE,
+                            skip=lambda path: path.endswith('.ascii.png'))
+    ready = settle(watcher, 0)
+    assert sorted(path for path, signature, digest in ready) == [
+        str(tmp_path / 'a.PNG'), str(tmp_path / 'sub' / 'c.png')]
+    finish(watcher, ready)
+    os.remove(tmp_path / 'sub' / 'c.png')
+    watcher.poll(now=10)
+    assert str(tmp_path / 'sub' / 'c.png') not in watcher.done
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from ascii_engine import load_image, normalize_mode
+
+RAMP = np.tile(np.linspace(0, 1, 256), (4, 1))
+
+
+def levels(img):
+    assert img.mode == 'L'
+    return np.asarray(img).astype(int)
+
+
+def expected():
+    return np.round(RAMP * 255).astype(int)
+
+
+def test_16_bit():
+    img = Image.fromarray(np.round(RAMP * 65535).astype(np.uint16))
+    assert img.mode == 'I;16'
+    assert np.abs(levels(normalize_mode(img)) - expected()).max() <= 1
+
+
+def test_float_in_unit_range():
+    img = Image.fromarray(RAMP.astype(np.float32), 'F')
+    assert np.abs(levels(normalize_mode(img)) - expected()).max() <= 1
+
+
+def test_float_stretched_by_its_range():
+    img = Image.fromarray((RAMP * 1000 - 500).astype(np.float32), 'F')
+    assert np.abs(levels(normalize_mode(img)) - expected()).max() <= 1
+
+
+def test_32_bit_holding_8_bit_values():
+    img = Image.fromarray(expected().astype(np.int32), 'I')
+    assert (levels(normalize_mode(img)) == expected()).all()
+
+
+def test_32_bit_scaled_by_its_maximum():
+    img = Image.fromarray(np.round(RAMP * 1_000_000).astype(np.int32), 'I')
+    assert np.abs(levels(normalize_mode(img)) - expected()).max() <= 1
+
+
+@pytest.mark.parametrize('mode, result', [('1', 'L'), ('P', 'RGB'), ('CMYK', 'RGB'), ('LA', 'RGBA'),
+                                          ('L', 'L'), ('RGB', 'RGB'), ('RGBA', 'RGBA')])
+def test_other_modes(mode, result):
+    assert normalize_mode(Image.new(mode, (8, 8))).mode == result
+
+
+def test_reduce_on_16_bit_file(tmp_path):
+    path = tmp_path / 'deep.png'
+    Image.fromarray(np.full((300, 2000), 65535, dtype=np.uint16)).save(path)
+    img, reduced = load_image(str(path), min_width=200)
+    assert reduced and img.mode == 'L' and img.width == 200
+    assert np.asarray(img).min() == 255
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from ascii_engine import PALETTES, PALETTE_BITS, palette_lut, quantize_palette, render_colored
+
+SHIFT = 8 - PALETTE_BITS
+
+
+def bucket_centers(rgb):
+    step = 1 << SHIFT
+    return (rgb >> SHIFT).astype(np.float64) * step + step // 2
+
+
+@pytest.fixture
+def colors():
+    return np.random.default_rng(1).integers(0, 256, (40, 50, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize('name', sorted(PALETTES))
+def test_tables_index_the_palette(name):
+    lut = palette_lut(name)
+    assert lut.shape == (1 << PALETTE_BITS,) * 3
+    assert lut.max() < len(PALETTES[name]['colors'])
+
+
+@pytest.mark.parametrize('name', ['ansi16', 'xterm256'])
+def test_nearest_palettes_pick_the_closest_entry(name, colors):
+    entries = np.array(PALETTES[name]['colors'], dtype=np.float64)
+    centers = bucket_centers(colors)
+    dist = ((centers[..., None, :] - entries) ** 2).sum(axis=-1)
+    chosen = quantize_palette(colors, name)
+    # Ties may go either way; the chosen entry must be as close as the best
+    assert np.allclose(np.take_along_axis(dist, chosen[..., None].astype(int), -1)[..., 0], dist.min(axis=-1))
+
+
+def test_default_palette_keeps_the_average_thresholds(colors):
+    # The original four colors by (r + g + b) / 3 at 60/120/180, per bucket
+    average = bucket_centers(colors).sum(axis=-1) / 3
+    assert (quantize_palette(colors, 'default') == np.digitize(average, [60, 120, 180])).all()
+
+
+@pytest.mark.parametrize('name', ['grayscale', 'retro'])
+def test_ramp_palettes_follow_luminance(name):
+    gray = np.repeat(np.arange(0, 256, 8, dtype=np.uint8)[:, None], 3, axis=1)[None]
+    index = quantize_palette(gray, name)[0].astype(int)
+    assert index[0] == 0 and index[-1] == len(PALETTES[name]['colors']) - 1
+    assert (np.diff(index) >= 0).all()
+
+
+def test_colored_runs_share_one_escape():
+    rgb = np.zeros((1, 4, 3), dtype=np.uint8)
+    rgb[0, 2:] = 255
+    text = render_colored(rgb, " @", 'ansi16', gray=np.array([[255] * 4], dtype=np.uint8))
+    assert text == "\033[30m@@\033[97m@@\033[0m"
@@ -0,0 +1,123 @@
+import json
+import re
+
+import pytest
+
+from ascii_engine import CastRecorder, HtmlRecorder, TextRecorder, FrameRecorder, FRAME_SEPARATOR
+
+FRAMES = [
+    "abcd\nefgh\nijkl",
+    "abXd\nefgh\nijkl",
+    "abXd\nefgh\nijkl",
+    "\033[31mab\033[0mXd\nefYY\nijkl",
+    "zzzz\nefYY",
+    "zzzz\nefYY\nnew!\nrow4",
+    "</script>\nefYY\nnew!\nrow4",
+]
+
+
+def apply(lines, row, start, span, whole):
+    while len(lines) <= row:
+        lines.append('')
+    old = lines[row]
+    lines[row] = span if whole else old[:start] + span + old[start + len(span):]
+
+
+def replay_cast(path):
+    # Minimal terminal: cursor moves, erase-to-end-of-line and clear screen
+    with open(path, encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        events = [json.loads(line) for line in f]
+    frames, lines = [], []
+    for timestamp, kind, data in events:
+        assert kind == 'o'
+        if data.startswith("\033[?25l\033[H\033[2J"):
+            data = data[len("\033[?25l\033[H\033[2J"):]
+            lines = []
+        parts = re.split(r"\033\[(\d+);(\d+)H", data)
+        for i in range(1, len(parts), 3):
+            row, start, span = int(parts[i]) - 1, int(parts[i + 1]) - 1, parts[i + 2]
+            whole = span.endswith("\033[K")
+            apply(lines, row, start, span[:-3] if whole else span, whole)
+        frames.append(lines[:])
+    return header, [timestamp for timestamp, kind, data in events], frames
+
+
+def replay_html(path):
+    # The player's show() in Python: keyframes start from an empty screen
+    with open(path, encoding='utf-8') as f:
+        page = f.read()
+    frames, lines = [], []
+    for changes, key in re.findall(r"^F\((.*), ([01])\);$", page, re.M):
+        if key == '1':
+            lines = []
+        for row, start, span, whole in json.loads(changes.replace('<\\/', '</')):
+            apply(lines, row, start, span, whole)
+        frames.append(lines[:])
+    return page, frames
+
+
+def visible(frames):
+    # Rows that were removed are blanked rather than deleted
+    return [[line for line in frame if line] for frame in frames]
+
+
+@pytest.mark.parametrize('interval', [1, 3, 100])
+def test_cast_replays_every_frame(tmp_path, interval):
+    path = str(tmp_path / 'out.cast')
+    with CastRecorder(path, 10, keyframe_interval=interval) as recorder:
+        for text in FRAMES:
+            recorder.add(text)
+    header, times, frames = replay_cast(path)
+    assert header['version'] == 2 and header['width'] == 4 and header['height'] == 3
+    assert times == pytest.approx([i / 10 for i in range(len(FRAMES))])
+    assert visible(frames) == [text.split('\n') for text in FRAMES]
+    assert recorder.keyframes == -(-len(FRAMES) // interval)
+
+
+@pytest.mark.parametrize('interval', [1, 3, 100])
+def test_html_replays_every_frame(tmp_path, interval):
+    path = str(tmp_path / 'out.html')
+    with HtmlRecorder(path, 10, keyframe_interval=interval) as recorder:
+        for text in FRAMES:
+            recorder.add(text)
+    page, frames = replay_html(path)
+    assert visible(frames) == [text.split('\n') for text in FRAMES]
+    # The frame data can't close the script early
+    assert page.count('</script>') == 1 and page.endswith('</html>\n')
+
+
+@pytest.mark.parametrize('recorder_class', [CastRecorder, HtmlRecorder])
+def test_deltas_are_smaller_than_full_frames(tmp_path, recorder_class):
+    # One changed cell per frame on a 80x40 screen
+    rows = ["." * 80] * 40
+    with recorder_class(str(tmp_path / 'out'), 10, keyframe_interval=60) as recorder:
+        for i in range(60):
+            frame = rows[:]
+            frame[i % 40] = frame[i % 40][:i] + "#" + frame[i % 40][i + 1:]
+            recorder.add("\n".join(frame))
+    assert recorder.keyframes == 1
+    assert recorder.bytes < recorder.full_bytes / 10
+
+
+def test_unchanged_frames_are_empty_deltas(tmp_path):
+    path = str(tmp_path / 'out.html')
+    with HtmlRecorder(path, 10) as recorder:
+        recorder.add("same")
+        recorder.add("same")
+    page, frames = replay_html(path)
+    assert "F([], 0);" in page
+
+
+def test_text_keeps_every_frame(tmp_path):
+    path = tmp_path / 'out.txt'
+    with TextRecorder(str(path), 10) as recorder:
+        for text in FRAMES:
+            recorder.add(text)
+    assert path.read_text(encoding='utf-8') == ''.join(text + FRAME_SEPARATOR for text in FRAMES)
+    assert recorder.keyframes == recorder.frames == len(FRAMES)
+
+
+def test_recorder_needs_write_frame(tmp_path):
+    with pytest.raises(TypeError):
+        FrameRecorder(str(tmp_path / 'out'), 10)
@@ -0,0 +1,155 @@
+import http.client
+import io
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from ascii_engine import ConversionService, ServiceBusy
+from ascii_converter_cli import UltimateASCIIArtConverter, ConversionHandler
+
+SLOW = 1.0
+
+
+def slow_convert(data, overrides):
+    # Stand-in for convert_bytes that stays in flight long enough to overlap
+    time.sleep(SLOW)
+    if data == b'junk':
+        raise ValueError('not an image')
+    return data.decode(), False
+
+
+def png(color='gray'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def start_server(service):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ConversionHandler)
+    server.converter = UltimateASCIIArtConverter()
+    server.service = service
+    server.max_body = 1024 * 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def serve(tmp_path, monkeypatch):
+    # Runs a ConversionHandler on an ephemeral port; shut down afterwards
+    monkeypatch.chdir(tmp_path)
+    servers = []
+    
+    def serve(convert, queue_size=4):
+        service = ConversionService(convert, 1, queue_size)
+        servers.append(start_server(service))
+        return servers[-1]
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=30)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.read().decode()
+    finally:
+        connection.close()
+
+
+def wait_in_flight(service, count):
+    deadline = time.monotonic() + 10
+    while service.metrics()['in_flight'] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_converts_an_image(serve):
+    server = serve(UltimateASCIIArtConverter().convert_bytes)
+    status, body = request(server, 'POST', '/convert?width=40', png())
+    assert status == 200
+    lines = body.split('\n')
+    assert len(lines[0]) == 40 and len(lines) > 1
+    status, body = request(server, 'POST', '/convert?width=20&format=json', png('white'))
+    assert status == 200
+    assert len(json.loads(body)['ascii'].split('\n')[0]) == 20
+
+
+def test_bad_requests(serve):
+    server = serve(UltimateASCIIArtConverter().convert_bytes)
+    assert request(server, 'POST', '/convert?colour=red', png())[0] == 400
+    assert request(server, 'POST', '/convert?width=abc', png())[0] == 400
+    assert request(server, 'POST', '/convert?palette=nope', png())[0] == 400
+    assert request(server, 'POST', '/convert?format=png', png())[0] == 400
+    assert request(server, 'POST', '/convert')[0] == 411
+    # Answered from the headers alone, before any of the body is read
+    too_big = {'Content-Length': str(server.max_body + 1)}
+    assert request(server, 'POST', '/convert', headers=too_big)[0] == 413
+    assert request(server, 'POST', '/convert', b'junk')[0] == 422
+    assert request(server, 'GET', '/nope')[0] == 404
+    assert request(server, 'GET', '/health') == (200, 'ok\n')
+
+
+def test_identical_requests_share_one_conversion(serve):
+    server = serve(slow_convert)
+    results = []
+    first = threading.Thread(target=lambda: results.append(
+        request(server, 'POST', '/convert?format=json', b'same')))
+    first.start()
+    wait_in_flight(server.service, 1)
+    status, body = request(server, 'POST', '/convert?format=json', b'same')
+    first.join()
+    assert status == 200 and results[0][0] == 200
+    answers = [json.loads(body), json.loads(results[0][1])]
+    assert [answer['ascii'] for answer in answers] == ['same', 'same']
+    assert sorted(answer['coalesced'] for answer in answers) == [False, True]
+    metrics = server.service.metrics()
+    assert (metrics['requests'], metrics['conversions'], metrics['coalesced']) == (2, 1, 1)
+
+
+def test_full_queue_answers_busy(serve):
+    server = serve(slow_convert, queue_size=1)
+    first = threading.Thread(target=request, args=(server, 'POST', '/convert', b'one'))
+    first.start()
+    wait_in_flight(server.service, 1)
+    status, body = request(server, 'POST', '/convert', b'two')
+    first.join()
+    assert status == 503
+    assert request(server, 'POST', '/convert', b'two') == (200, 'two')
+    metrics = server.service.metrics()
+    assert metrics['rejected'] == 1
+    # Busy answers are not conversion errors
+    assert metrics['errors'] == 0
+
+
+def test_metrics(serve):
+    server = serve(slow_convert)
+    request(server, 'POST', '/convert', b'one')
+    request(server, 'POST', '/convert', b'junk')
+    status, body = request(server, 'GET', '/metrics')
+    metrics = json.loads(body)
+    assert status == 200
+    assert (metrics['requests'], metrics['conversions'], metrics['errors']) == (2, 2, 1)
+    assert metrics['in_flight'] == 0 and metrics['workers'] == 1
+    assert metrics['latency_ms']['window'] == 2
+    assert metrics['latency_ms']['p50'] >= SLOW * 1000
+
+
+def test_service_busy_without_http():
+    service = ConversionService(slow_convert, 1, queue_size=1)
+    try:
+        future, coalesced = service.submit('a', b'a', {})
+        assert not coalesced
+        assert service.submit('a', b'a', {}) == (future, True)
+        with pytest.raises(ServiceBusy):
+            service.submit('b', b'b', {})
+        assert future.result() == ('a', False)
+    finally:
+        service.close()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from ascii_engine import SUBPIXEL_MODES, pack_subpixels, render_subpixels, subpixel_grid
+
+# Unicode Braille dot numbering: bit of each (column, row) dot in the 2x4 cell
+BRAILLE_DOTS = {(0, 0): 0x01, (0, 1): 0x02, (0, 2): 0x04, (1, 0): 0x08,
+                (1, 1): 0x10, (1, 2): 0x20, (0, 3): 0x40, (1, 3): 0x80}
+
+
+@pytest.mark.parametrize('dot, bit', sorted(BRAILLE_DOTS.items()))
+def test_single_braille_dots(dot, bit):
+    mask = np.zeros((4, 2), dtype=bool)
+    mask[dot[1], dot[0]] = True
+    assert pack_subpixels(mask, 'braille').tolist() == [[0x2800 + bit]]
+
+
+def test_braille_patterns():
+    mask = np.zeros((4, 6), dtype=bool)
+    mask[:, 2:4] = True  # second cell full
+    mask[0, 4] = mask[3, 5] = True  # third cell: dots 1 and 8
+    assert pack_subpixels(mask, 'braille').tolist() == [[0x2800, 0x28FF, 0x2881]]
+
+
+@pytest.mark.parametrize('top, bottom, char', [(0, 0, ' '), (1, 0, '▀'), (0, 1, '▄'), (1, 1, '█')])
+def test_half_blocks(top, bottom, char):
+    mask = np.array([[top], [bottom]], dtype=bool)
+    assert pack_subpixels(mask, 'halfblock').tolist() == [[ord(char)]]
+
+
+@pytest.mark.parametrize('mode', sorted(SUBPIXEL_MODES))
+def test_grid_and_threshold(mode):
+    width, height = subpixel_grid((3, 2), mode)
+    gray = np.zeros((height, width), dtype=np.uint8)
+    lines = render_subpixels(gray, mode).split('\n')
+    assert len(lines) == 2 and all(len(line) == 3 for line in lines)
+    full = render_subpixels(gray + 255, mode)
+    assert set(full.replace('\n', '')) == {chr(SUBPIXEL_MODES[mode][2][-1])}
+
+
+def test_colored_half_blocks_use_both_colors():
+    rgb = np.zeros((2, 1, 3), dtype=np.uint8)
+    rgb[0] = (255, 0, 0)
+    rgb[1] = (0, 0, 255)
+    text = render_subpixels(np.zeros((2, 1), dtype=np.uint8), 'halfblock', rgb=rgb)
+    assert text == "\033[38;2;255;0;0;48;2;0;0;255m▀\033[0m"
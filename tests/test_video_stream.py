@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from ascii_engine import VideoStream
+
+FRAMES = 12
+SIZE = (64, 48)
+
+
+@pytest.fixture
+def clip(tmp_path):
+    # Frame i is a flat gray of 20 * i, so the decoded mean tells frames apart
+    path = str(tmp_path / 'clip.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, SIZE)
+    assert writer.isOpened()
+    for i in range(FRAMES):
+        writer.write(np.full((SIZE[1], SIZE[0], 3), 20 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def mean_gray(img):
+    return round(float(np.asarray(img.convert('L')).mean()) / 20)
+
+
+def test_frames_come_out_in_order(clip):
+    stream = VideoStream(clip, mean_gray, queue_size=2)
+    assert stream.fps == pytest.approx(10, abs=0.5)
+    assert list(stream) == [(i, i) for i in range(FRAMES)]
+
+
+def test_skip_to_drops_earlier_frames(clip):
+    stream = VideoStream(clip, mean_gray, queue_size=2)
+    seen = []
+    for index, level in stream:
+        seen.append(index)
+        if index == 2:
+            stream.skip_to(8)
+    assert seen[:3] == [0, 1, 2]
+    assert all(index >= 8 for index in seen[3:])
+    assert seen[-1] == FRAMES - 1
+
+
+def test_closing_early_stops_the_threads(clip):
+    stream = VideoStream(clip, mean_gray, queue_size=1)
+    for index, level in stream:
+        break
+    assert stream.stopped.is_set()
+    assert not any(thread.is_alive() for thread in stream.threads)
+
+
+def test_conversion_errors_reach_the_consumer(clip):
+    def convert(img):
+        raise RuntimeError('boom')
+    with pytest.raises(RuntimeError, match='boom'):
+        list(VideoStream(clip, convert))
+
+
+def test_missing_file_raises(tmp_path):
+    with pytest.raises(ValueError):
+        VideoStream(str(tmp_path / 'missing.avi'), mean_gray)